@@ -1,167 +1,342 @@
 """
 Точка входа для запуска MCP сервера.
-Импорты инструментов обязательны для регистрации декораторов.
+Импорты инструментов обязательны для регистрации декораторов,
+они выполняются в _register_tools() перед запуском (stdio)
+или в фоне при старте приложения (HTTP/SSE).
 """
 import os
 import sys
 import asyncio
+import atexit
+import contextlib
+import gzip
+import hashlib
+import importlib
+import inspect
 import logging
+import logging.handlers
+import queue
 import signal
-from typing import Any
+import traceback
+import warnings
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, List, Literal, Optional, Tuple
+
+import orjson
+from dotenv import load_dotenv
+from pydantic import BaseModel, Field, ValidationError, model_validator
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Match, Route
+
 from mcp_instance import mcp
+from tools import result_cache
+from tools.http_client import close_http_client
+
+# Загружаем переменные окружения
+load_dotenv()
+
+# sse_app() в FastMCP помечен устаревшим, но новый API требует дополнительные
+# параметры — подавляем только это предупреждение (FastMCP выдаёт его со
+# stacklevel=2, поэтому фильтруем по тексту сообщения, а не по модулю)
+warnings.filterwarnings("ignore", message=r".*sse_app", category=DeprecationWarning)
 
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+# Настройка логирования: обработчики пишут записи в очередь, а вывод
+# в stderr выполняет фоновый поток QueueListener, не блокируя event loop
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_log_stream_handler = logging.StreamHandler()
+_log_stream_handler.setFormatter(logging.Formatter(
+    '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     datefmt='%Y-%m-%d %H:%M:%S'
-)
+))
+# QueueHandler.prepare() подставляет отформатированный текст в record.msg,
+# поэтому сам он форматирует только сообщение — префикс добавит StreamHandler
+_log_queue_handler = logging.handlers.QueueHandler(_log_queue)
+_log_queue_handler.setFormatter(logging.Formatter('%(message)s'))
+logging.getLogger().addHandler(_log_queue_handler)
+logging.getLogger().setLevel(logging.INFO)
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_stream_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop)
 logger = logging.getLogger(__name__)
 
-# Импорты инструментов для регистрации декораторов
-from tools.get_images import get_images  # noqa: F401
-from tools.get_quiz import get_quiz  # noqa: F401
-from tools.export_quiz import export_quiz  # noqa: F401
-from tools.get_text_from_wiki import get_text_from_wiki  # noqa: F401
-from tools.wiki_get_material import wiki_get_material  # noqa: F401
-from tools.schedule_lesson import schedule_lesson  # noqa: F401
-from tools.create_presentation import create_presentation  # noqa: F401
 
 
-def validate_configuration() -> None:
+@dataclass(frozen=True, slots=True)
+class Config:
+    """Параметры запуска сервера, прочитанные из окружения один раз."""
+    mode: str
+    transport: str
+    # PORT остаётся строкой: его проверяет validate_configuration()
+    # с понятным сообщением, а не исключение при импорте модуля
+    port: str
+    host: str
+    # Путь MCP endpoint в выбранном транспорте
+    mcp_path: str
+    # Access log uvicorn (UVICORN_ACCESS_LOG=1), по умолчанию выключен
+    access_log: bool
+
+
+@lru_cache(maxsize=1)
+def get_config() -> Config:
+    """Чтение параметров запуска из окружения (выполняется один раз)."""
+    transport = os.getenv("MCP_TRANSPORT", "sse").lower()
+    return Config(
+        mode=os.getenv("MCP_MODE", "sse").lower(),
+        transport=transport,
+        port=os.getenv("PORT", "8000"),
+        host=os.getenv("HOST", "0.0.0.0"),
+        mcp_path="/sse" if transport == "sse" else "/",
+        access_log=os.getenv("UVICORN_ACCESS_LOG") == "1",
+    )
+
+
+CFG = get_config()
+
+# Список инструментов и его сериализуемый снимок для /tools,
+# заполняются один раз в check_tools_registration()
+TOOLS_LIST: List[Any] = []
+TOOLS_SNAPSHOT: List[Dict[str, Any]] = []
+# Число инструментов для /health: набор статичен после регистрации
+_TOOLS_COUNT: int = 0
+
+# Признак завершения регистрации инструментов (в режиме HTTP/SSE идёт в фоне)
+TOOLS_READY = asyncio.Event()
+
+
+# Модули инструментов (tools/<name>.py), регистрирующие декораторы @mcp.tool()
+TOOL_MODULES = (
+    "get_images",
+    "get_quiz",
+    "export_quiz",
+    "get_text_from_wiki",
+    "wiki_get_material",
+    "schedule_lesson",
+    "create_presentation",
+    "result_cache",
+)
+
+
+def _register_tools() -> None:
+    """
+    Импорт модулей инструментов для регистрации декораторов @mcp.tool().
+    
+    Вызывается из точки входа, а не при импорте server.py: импорт модуля
+    (например, из тестов) не тянет за собой зависимости всех инструментов,
+    а при неверной конфигурации сервер завершается до их загрузки.
+    Тяжёлые библиотеки (Aspose Slides, Google API) дополнительно
+    импортируются лениво внутри самих инструментов.
+    """
+    for name in TOOL_MODULES:
+        importlib.import_module(f"tools.{name}")
+
+
+async def _register_tools_async() -> None:
+    """
+    Фоновая регистрация инструментов в режиме HTTP/SSE.
+    
+    Модули импортируются в потоке event loop: декораторы @mcp.tool()
+    изменяют менеджер инструментов FastMCP, и делать это из другого потока,
+    пока сервер уже принимает запросы, небезопасно. Импорт дешёвый (тяжёлые
+    библиотеки загружаются лениво), а между модулями управление отдаётся
+    циклу, так что uvicorn сразу принимает подключения, а /health
+    до завершения отвечает 503 {"status": "starting"}.
+    """
+    try:
+        for name in TOOL_MODULES:
+            importlib.import_module(f"tools.{name}")
+            await asyncio.sleep(0)
+    except Exception:
+        logger.exception("Ошибка при загрузке модулей инструментов")
+    
+    check_tools_registration()
+    _publish_tools_state()
+    TOOLS_READY.set()
+
+
+class Settings(BaseModel):
+    """
+    Параметры окружения с типами и ограничениями.
+    
+    Разбираются и проверяются за один проход pydantic: неверное значение
+    останавливает запуск с перечнем всех ошибок сразу.
+    """
+    mcp_mode: Literal["stdio", "sse"] = Field("sse", alias="MCP_MODE")
+    port: int = Field(8000, ge=1, le=65535, alias="PORT")
+    host: str = Field("0.0.0.0", alias="HOST")
+    unsplash_access_key: Optional[str] = Field(None, alias="UNSPLASH_ACCESS_KEY")
+    yandex_api_key: Optional[str] = Field(None, alias="YANDEX_API_KEY")
+    yandex_iam_token: Optional[str] = Field(None, alias="YANDEX_IAM_TOKEN")
+    yandex_folder_id: Optional[str] = Field(None, alias="YANDEX_FOLDER_ID")
+    
+    @model_validator(mode="after")
+    def _check_host(self) -> "Settings":
+        """HOST используется только в режиме sse — там он не может быть пустым."""
+        if self.mcp_mode == "sse" and not self.host:
+            raise ValueError("HOST не может быть пустым")
+        return self
+    
+    @property
+    def yandex_configured(self) -> bool:
+        """Для Yandex API нужен либо API_KEY, либо IAM_TOKEN + FOLDER_ID."""
+        return bool(self.yandex_api_key or (self.yandex_iam_token and self.yandex_folder_id))
+
+
+def validate_configuration() -> Settings:
     """Проверка конфигурации перед запуском."""
-    mode = os.getenv("MCP_MODE", "sse").lower()
+    # Режим, порт и хост берутся из CFG, чтобы проверялись те же значения,
+    # с которыми сервер будет запущен
+    env = {
+        "MCP_MODE": CFG.mode,
+        "HOST": CFG.host,
+        "UNSPLASH_ACCESS_KEY": os.getenv("UNSPLASH_ACCESS_KEY"),
+        "YANDEX_API_KEY": os.getenv("YANDEX_API_KEY"),
+        "YANDEX_IAM_TOKEN": os.getenv("YANDEX_IAM_TOKEN"),
+        "YANDEX_FOLDER_ID": os.getenv("YANDEX_FOLDER_ID"),
+    }
+    # PORT используется только в режиме sse
+    if CFG.mode == "sse":
+        env["PORT"] = CFG.port
     
-    if mode not in ["stdio", "sse"]:
-        logger.error(f"Неверный MCP_MODE={mode}. Допустимые значения: stdio, sse")
+    try:
+        settings = Settings.model_validate(env)
+    except ValidationError as e:
+        logger.error(f"Неверная конфигурация окружения:\n{e}")
         sys.exit(1)
     
-    if mode == "sse":
-        try:
-            port = int(os.getenv("PORT", 8000))
-            if port < 1 or port > 65535:
-                raise ValueError(f"Порт должен быть в диапазоне 1-65535, получено: {port}")
-        except ValueError as e:
-            logger.error(f"Неверный PORT: {e}")
-            sys.exit(1)
-        
-        host = os.getenv("HOST", "0.0.0.0")
-        if not host:
-            logger.error("HOST не может быть пустым")
-            sys.exit(1)
-        
+    if settings.mcp_mode == "sse":
         # Проверка обязательных API ключей
-        required_keys = ["UNSPLASH_ACCESS_KEY"]
-        missing_keys = [key for key in required_keys if not os.getenv(key)]
+        if not settings.unsplash_access_key:
+            logger.warning("Отсутствуют API ключи: UNSPLASH_ACCESS_KEY. Некоторые функции могут не работать.")
         
-        if missing_keys:
-            logger.warning(f"Отсутствуют API ключи: {', '.join(missing_keys)}. Некоторые функции могут не работать.")
-        
-        # Проверка Yandex API (нужен либо API_KEY, либо IAM_TOKEN + FOLDER_ID)
-        yandex_api_key = os.getenv("YANDEX_API_KEY")
-        yandex_iam_token = os.getenv("YANDEX_IAM_TOKEN")
-        yandex_folder_id = os.getenv("YANDEX_FOLDER_ID")
-        
-        if not yandex_api_key and not (yandex_iam_token and yandex_folder_id):
+        if not settings.yandex_configured:
             logger.warning("Yandex API не настроен. Функция перевода может не работать.")
+    
+    return settings
+
+
+# Способы получения инструментов в разных версиях FastMCP, в порядке проверки.
+# Каждый напрямую обращается к атрибутам: при их отсутствии будет AttributeError.
+_ACCESSORS: List[Tuple[str, Callable[[Any], Any]]] = [
+    ("list_tools", lambda m: m.list_tools()),
+    ("_tool_manager._tools", lambda m: m._tool_manager._tools),
+    ("_tools", lambda m: m._tools),
+    ("tools", lambda m: m.tools),
+    ("_server._tools", lambda m: m._server._tools),
+    ("_server.tools", lambda m: m._server.tools),
+    ("_server._registered_tools", lambda m: m._server._registered_tools),
+    ("_server.registered_tools", lambda m: m._server.registered_tools),
+]
+
+
+def _as_tools_list(source: Any) -> List[Any]:
+    """Приведение найденного хранилища инструментов к списку."""
+    if isinstance(source, dict):
+        return list(source.values())
+    return list(source or [])
+
+
+def _find_tools_dict() -> Optional[Dict[str, Any]]:
+    """Первое хранилище инструментов из _ACCESSORS, являющееся словарём имя → инструмент."""
+    for _, accessor in _ACCESSORS:
+        try:
+            source = accessor(mcp)
+        except AttributeError:
+            continue
+        if inspect.iscoroutine(source):
+            source.close()
+        elif isinstance(source, dict):
+            return source
+    return None
+
+
+# Индекс сработавшего способа из _ACCESSORS и построенная для него функция.
+# Версия FastMCP в процессе не меняется, поэтому после первого успешного
+# поиска используется только этот способ.
+WINNING_PROBE: Optional[int] = None
+_TOOLS_ACCESSOR: Optional[Callable[[], List[Any]]] = None
+
+
+def _resolve_tools_accessor() -> Callable[[], List[Any]]:
+    """
+    Поиск способа получения списка инструментов FastMCP.
+    
+    FastMCP хранит инструменты в разных местах в зависимости от версии,
+    поэтому способы из _ACCESSORS перебираются до первого сработавшего;
+    его индекс (WINNING_PROBE) и функция доступа (_TOOLS_ACCESSOR)
+    запоминаются на всё время жизни процесса.
+    
+    Returns:
+        Функция без аргументов, возвращающая список инструментов.
+    """
+    global WINNING_PROBE, _TOOLS_ACCESSOR
+    if _TOOLS_ACCESSOR is not None:
+        return _TOOLS_ACCESSOR
+    
+    for index, (name, accessor) in enumerate(_ACCESSORS):
+        try:
+            source = accessor(mcp)
+        except AttributeError:
+            continue
+        if inspect.isawaitable(source):
+            # В новых версиях list_tools асинхронный — синхронно его не вызвать
+            if inspect.iscoroutine(source):
+                source.close()
+            continue
+        try:
+            if _as_tools_list(source):
+                WINNING_PROBE = index
+                _TOOLS_ACCESSOR = lambda accessor=accessor: _as_tools_list(accessor(mcp))
+                logger.debug(f"Инструменты FastMCP найдены через {name}")
+                return _TOOLS_ACCESSOR
+        except TypeError:
+            continue
+    
+    return lambda: []
+
+
+def _tool_name(tool: Any) -> str:
+    """Имя инструмента независимо от формы его хранения в FastMCP."""
+    return getattr(tool, 'name', getattr(tool, '__name__', str(tool)))
+
+
+def _build_tools_snapshot(tools_list: List[Any]) -> List[Dict[str, Any]]:
+    """Сборка описаний инструментов ({name, description, parameters}) для /tools."""
+    snapshot = []
+    for tool in tools_list:
+        tool_info = {
+            "name": _tool_name(tool),
+            "description": getattr(tool, 'description', ''),
+        }
+        if hasattr(tool, 'parameters'):
+            tool_info["parameters"] = tool.parameters
+        snapshot.append(tool_info)
+    return snapshot
 
 
 def check_tools_registration() -> None:
     """Проверка регистрации инструментов."""
+    global TOOLS_LIST, TOOLS_SNAPSHOT, _TOOLS_COUNT
     try:
         # Примечание: инструменты регистрируются через декораторы @mcp.tool()
         # при импорте модулей. Проверка может не найти их через внутренние
         # атрибуты, но это не означает, что они не зарегистрированы.
+        tools_list = _resolve_tools_accessor()()
+        tools_count = len(tools_list)
         
-        # Пытаемся получить список инструментов через внутренний атрибут FastMCP
-        # FastMCP хранит инструменты в разных местах в зависимости от версии
-        tools_count = 0
-        tools_list = []
-        
-        # Пробуем разные способы доступа к инструментам
-        # 1. Через метод list_tools (если есть)
-        if hasattr(mcp, 'list_tools'):
-            try:
-                tools = mcp.list_tools()
-                tools_count = len(tools) if tools else 0
-                tools_list = tools if tools else []
-            except Exception:
-                pass
-        
-        # 2. Через внутренний атрибут _tools (dict)
-        if tools_count == 0 and hasattr(mcp, '_tools'):
-            try:
-                tools_dict = getattr(mcp, '_tools', {})
-                if isinstance(tools_dict, dict):
-                    tools_count = len(tools_dict)
-                    tools_list = list(tools_dict.keys())
-            except Exception:
-                pass
-        
-        # 3. Через атрибут tools
-        if tools_count == 0 and hasattr(mcp, 'tools'):
-            try:
-                tools_dict = getattr(mcp, 'tools', {})
-                if isinstance(tools_dict, dict):
-                    tools_count = len(tools_dict)
-                    tools_list = list(tools_dict.keys())
-            except Exception:
-                pass
-        
-        # 4. Через _server._tools (внутренняя структура FastMCP)
-        if tools_count == 0 and hasattr(mcp, '_server'):
-            try:
-                server = getattr(mcp, '_server')
-                if hasattr(server, '_tools'):
-                    tools_dict = getattr(server, '_tools', {})
-                    if isinstance(tools_dict, dict):
-                        tools_count = len(tools_dict)
-                        tools_list = list(tools_dict.keys())
-            except Exception:
-                pass
-        
-        # 5. Через _server.tools (альтернативный путь)
-        if tools_count == 0 and hasattr(mcp, '_server'):
-            try:
-                server = getattr(mcp, '_server')
-                if hasattr(server, 'tools'):
-                    tools_dict = getattr(server, 'tools', {})
-                    if isinstance(tools_dict, dict):
-                        tools_count = len(tools_dict)
-                        tools_list = list(tools_dict.keys())
-            except Exception:
-                pass
-        
-        # 6. Через _call_tool_mcp (проверяем наличие инструментов через вызов)
-        if tools_count == 0 and hasattr(mcp, '_call_tool_mcp'):
-            try:
-                # Пытаемся получить список через внутренний метод
-                # Это может не сработать, но попробуем
-                if hasattr(mcp, '_server'):
-                    server = getattr(mcp, '_server')
-                    # Проверяем все возможные места хранения
-                    for attr_name in ['_tools', 'tools', '_registered_tools', 'registered_tools']:
-                        if hasattr(server, attr_name):
-                            tools_dict = getattr(server, attr_name)
-                            if isinstance(tools_dict, dict) and len(tools_dict) > 0:
-                                tools_count = len(tools_dict)
-                                tools_list = list(tools_dict.keys())
-                                break
-            except Exception:
-                pass
-        
-        # 7. Прямая проверка через dir() для отладки
-        if tools_count == 0:
+        # 7. Прямая проверка через dir() для отладки: dir() обходит MRO
+        # всего дерева объектов FastMCP, поэтому выполняется только при DEBUG
+        if tools_count == 0 and logger.isEnabledFor(logging.DEBUG):
             # Выводим доступные атрибуты для отладки
             mcp_attrs = [attr for attr in dir(mcp) if not attr.startswith('__')]
-            print(f"🔍 Доступные атрибуты FastMCP: {', '.join(mcp_attrs[:10])}...")
+            logger.debug(f"Доступные атрибуты FastMCP: {', '.join(mcp_attrs[:10])}...")
             
             # Пытаемся проверить через _server
             if hasattr(mcp, '_server'):
                 try:
                     server = getattr(mcp, '_server')
                     server_attrs = [attr for attr in dir(server) if not attr.startswith('__')]
-                    print(f"🔍 Доступные атрибуты _server: {', '.join(server_attrs[:10])}...")
+                    logger.debug(f"Доступные атрибуты _server: {', '.join(server_attrs[:10])}...")
                     
                     # Проверяем все атрибуты, которые могут содержать инструменты
                     for attr in server_attrs:
@@ -169,16 +344,19 @@ def check_tools_registration() -> None:
                             try:
                                 value = getattr(server, attr)
                                 if isinstance(value, dict):
-                                    print(f"🔍 Найден словарь в {attr}: {len(value)} элементов")
+                                    logger.debug(f"Найден словарь в {attr}: {len(value)} элементов")
                                     if len(value) > 0:
                                         tools_count = len(value)
-                                        tools_list = list(value.keys())
+                                        tools_list = list(value.values())
                                         break
                             except Exception:
                                 pass
                 except Exception as e:
-                    print(f"🔍 Ошибка при проверке _server: {e}")
+                    logger.debug(f"Ошибка при проверке _server: {e}")
         
+        TOOLS_LIST = tools_list
+        TOOLS_SNAPSHOT = _build_tools_snapshot(tools_list)
+        _TOOLS_COUNT = tools_count
         logger.info(f"Зарегистрировано инструментов: {tools_count}")
         
         if tools_count == 0:
@@ -188,18 +366,8 @@ def check_tools_registration() -> None:
             logger.warning("Проверьте работоспособность через /tools endpoint или подключение агента.")
         else:
             logger.info("Список инструментов:")
-            if isinstance(tools_list, list) and len(tools_list) > 0:
-                if isinstance(tools_list[0], str):
-                    # Если это список строк (имен)
-                    for tool_name in tools_list:
-                        logger.info(f"   - {tool_name}")
-                else:
-                    # Если это объекты инструментов
-                    for tool in tools_list:
-                        tool_name = getattr(tool, 'name', getattr(tool, '__name__', str(tool)))
-                        logger.info(f"   - {tool_name}")
-            else:
-                logger.info("   (детали недоступны)")
+            for tool in tools_list:
+                logger.info(f"   - {_tool_name(tool)}")
                 
     except Exception as e:
         logger.warning(f"Не удалось проверить список инструментов: {e}")
@@ -207,244 +375,427 @@ def check_tools_registration() -> None:
         logger.debug("Traceback:", exc_info=True)
 
 
-def create_health_endpoints(base_app) -> Any:
-    """Создание дополнительных endpoints для диагностики."""
+class ToolNotFoundError(LookupError):
+    """Инструмент с указанным именем не зарегистрирован."""
+
+
+def _text_payload(text: str) -> Any:
+    """JSON из текста TextContent; если это не JSON — сам текст."""
     try:
-        from starlette.applications import Starlette
-        from starlette.routing import Route, Mount
-        from starlette.responses import JSONResponse
-        
-        async def health_check(request):
-            """Health check endpoint."""
-            try:
-                # Пытаемся получить количество инструментов
-                tools_count = 0
-                if hasattr(mcp, 'list_tools'):
-                    tools = mcp.list_tools()
-                    tools_count = len(tools) if tools else 0
-                elif hasattr(mcp, '_tools'):
-                    tools_count = len(getattr(mcp, '_tools', {}))
-                elif hasattr(mcp, 'tools'):
-                    tools_count = len(getattr(mcp, 'tools', {}))
-                
-                return JSONResponse({
-                    "status": "ok",
-                    "tools_count": tools_count,
-                    "mode": os.getenv("MCP_MODE", "sse"),
-                    "transport": os.getenv("MCP_TRANSPORT", "sse")
-                })
-            except Exception as e:
-                return JSONResponse({
-                    "status": "error",
-                    "error": str(e)
-                }, status_code=500)
+        return orjson.loads(text)
+    except ValueError:
+        return text
+
+
+def _extract_first(items: Any) -> Any:
+    """Извлечение первого элемента content; пустой список — строкой."""
+    if not items:
+        return str(items)
+    first = items[0]
+    return _EXTRACTORS.get(type(first).__name__, str)(first)
+
+
+# Структура ответа FastMCP известна заранее, поэтому извлекатель выбирается
+# по имени типа одним поиском в словаре вместо цепочки hasattr()
+_EXTRACTORS: Dict[str, Callable[[Any], Any]] = {
+    "TextContent": lambda r: _text_payload(r.text),
+    "CallToolResult": lambda r: _extract_first(r.content),
+    "list": _extract_first,
+    "tuple": _extract_first,
+}
+
+
+def _extract_mcp_result(result: Any) -> Any:
+    """Преобразование CallToolResult FastMCP в JSON-совместимые данные."""
+    return _EXTRACTORS.get(type(result).__name__, str)(result)
+
+
+def _extract_plain_result(result: Any) -> Any:
+    """Результат _call_tool: JSON-совместимые значения как есть, остальное — строкой."""
+    if isinstance(result, (dict, list, str, int, float, bool, type(None))):
+        return result
+    return str(result)
+
+
+def _resolve_tool_caller() -> Tuple[Optional[Callable[[str, Dict[str, Any]], Awaitable[Any]]], Callable[[Any], Any]]:
+    """
+    Однократный выбор способа вызова инструментов для /api/call-tool.
+    
+    Набор методов FastMCP зависит от версии и в процессе не меняется,
+    поэтому проверка выполняется один раз при импорте модуля.
+    
+    Returns:
+        Кортеж (функция вызова или None, функция извлечения результата).
+    """
+    # Метод 1: Через _call_tool_mcp (основной метод FastMCP)
+    if hasattr(mcp, '_call_tool_mcp'):
+        return mcp._call_tool_mcp, _extract_mcp_result
+    
+    # Метод 2: Через _call_tool (альтернативный метод)
+    if hasattr(mcp, '_call_tool'):
+        return mcp._call_tool, _extract_plain_result
+    
+    # Метод 3: Прямой вызов через словарь инструментов (если доступен)
+    tools_dict = _find_tools_dict()
+    if tools_dict is not None:
+        async def call_direct(tool_name: str, arguments: Dict[str, Any]) -> Any:
+            if tool_name not in tools_dict:
+                raise ToolNotFoundError(tool_name)
+            # Объект Tool хранит исходную функцию в fn
+            tool_func = getattr(tools_dict[tool_name], 'fn', tools_dict[tool_name])
+            if asyncio.iscoroutinefunction(tool_func):
+                return await tool_func(**arguments)
+            return tool_func(**arguments)
         
-        async def list_tools_endpoint(request):
-            """Endpoint для просмотра зарегистрированных инструментов."""
-            try:
-                tools_list = []
-                
-                # Пытаемся получить список инструментов
-                if hasattr(mcp, 'list_tools'):
-                    tools = mcp.list_tools()
-                    if tools:
-                        for tool in tools:
-                            tool_info = {
-                                "name": getattr(tool, 'name', getattr(tool, '__name__', str(tool))),
-                                "description": getattr(tool, 'description', ''),
-                            }
-                            if hasattr(tool, 'parameters'):
-                                tool_info["parameters"] = tool.parameters
-                            tools_list.append(tool_info)
-                elif hasattr(mcp, '_tools'):
-                    tools_dict = getattr(mcp, '_tools', {})
-                    for tool_name, tool_obj in tools_dict.items():
-                        tool_info = {
-                            "name": tool_name,
-                            "description": getattr(tool_obj, 'description', ''),
-                        }
-                        if hasattr(tool_obj, 'parameters'):
-                            tool_info["parameters"] = tool_obj.parameters
-                        tools_list.append(tool_info)
-                elif hasattr(mcp, 'tools'):
-                    tools_dict = getattr(mcp, 'tools', {})
-                    for tool_name, tool_obj in tools_dict.items():
-                        tool_info = {
-                            "name": tool_name,
-                            "description": getattr(tool_obj, 'description', ''),
-                        }
-                        if hasattr(tool_obj, 'parameters'):
-                            tool_info["parameters"] = tool_obj.parameters
-                        tools_list.append(tool_info)
-                
-                return JSONResponse({
-                    "tools": tools_list,
-                    "count": len(tools_list)
-                })
-            except Exception as e:
-                return JSONResponse({
-                    "error": str(e)
-                }, status_code=500)
+        return call_direct, lambda result: result
+    
+    return None, lambda result: result
+
+
+_CALL_TOOL, _EXTRACT = _resolve_tool_caller()
+
+
+class StaticJSONApp:
+    """
+    ASGI-приложение, отдающее заранее сериализованный JSON.
+    
+    Экземпляр класса (а не функция) передаётся в Route как «сырое» ASGI-приложение:
+    Starlette не создаёт для него Request и объект Response.
+    """
+    
+    def __init__(self, body: bytes, status: int = 200) -> None:
+        self.set_body(body, status)
+    
+    def set_body(self, body: bytes, status: int = 200) -> None:
+        """Замена отдаваемого тела (например, после регистрации инструментов)."""
+        self.body = body
+        self.status = status
+        self.headers = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("ascii")),
+        ]
+    
+    async def __call__(self, scope, receive, send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status,
+            "headers": self.headers,
+        })
+        await send({"type": "http.response.body", "body": self.body})
+
+
+class ExactRoute(Route):
+    """Route для статического пути: сравнение строк вместо regex-матчинга."""
+
+    def matches(self, scope):
+        if scope["type"] == "http" and scope["path"] == self.path:
+            child_scope = {
+                "endpoint": self.endpoint,
+                "path_params": dict(scope.get("path_params", {}))
+            }
+            if self.methods and scope["method"] not in self.methods:
+                return Match.PARTIAL, child_scope
+            return Match.FULL, child_scope
+        return Match.NONE, {}
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse с сериализацией через orjson."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+
+class CallToolRequest(BaseModel):
+    """Тело запроса /api/call-tool."""
+    tool_name: str = Field(..., min_length=1)
+    arguments: Dict[str, Any] = Field(default_factory=dict)
+
+
+async def call_tool_endpoint(request):
+    """HTTP endpoint для вызова MCP инструментов (для тестирования)."""
+    try:
+        # Разбор и проверка тела за один проход (парсер pydantic-core)
+        try:
+            call = CallToolRequest.model_validate_json(await request.body())
+        except ValidationError as e:
+            return ORJSONResponse({
+                "error": f"Invalid request: {e}"
+            }, status_code=400)
+        tool_name = call.tool_name
+        arguments = call.arguments
+
+        # Запрос, пришедший во время фоновой регистрации, ждёт её завершения
+        if not TOOLS_READY.is_set():
+            await TOOLS_READY.wait()
         
-        async def root_endpoint(request):
-            """Root endpoint."""
-            return JSONResponse({
-                "service": "MCP Server for EdTech",
-                "version": "0.3.3",
-                "status": "running",
-                "endpoints": {
-                    "health": "/health",
-                    "tools": "/tools",
-                    "call_tool": "/api/call-tool",
-                    "mcp": "/sse" if os.getenv("MCP_TRANSPORT", "sse").lower() == "sse" else "/"
-                }
+        if _CALL_TOOL is None:
+            return ORJSONResponse({
+                "error": "Tool calling method not available"
+            }, status_code=500)
+
+        # Вызов инструмента через FastMCP
+        cache_key = result_cache.make_key(tool_name, arguments)
+        hit, cached = result_cache.get_cached(cache_key)
+        if hit:
+            return ORJSONResponse({
+                "success": True,
+                "tool_name": tool_name,
+                "result": cached
             })
-        
-        async def call_tool_endpoint(request):
-            """HTTP endpoint для вызова MCP инструментов (для тестирования)."""
-            try:
-                data = await request.json()
-                tool_name = data.get("tool_name")
-                arguments = data.get("arguments", {})
-                
-                if not tool_name:
-                    return JSONResponse({
-                        "error": "tool_name is required"
-                    }, status_code=400)
-                
-                # Вызов инструмента через FastMCP
-                try:
-                    # Пытаемся найти и вызвать инструмент напрямую
-                    result_data = None
-                    
-                    # Метод 1: Через _call_tool_mcp (основной метод FastMCP)
-                    if hasattr(mcp, '_call_tool_mcp'):
-                        result = await mcp._call_tool_mcp(tool_name, arguments)
-                        # Преобразуем результат FastMCP в JSON
-                        if hasattr(result, 'content'):
-                            if isinstance(result.content, list) and len(result.content) > 0:
-                                content_item = result.content[0]
-                                if hasattr(content_item, 'text'):
-                                    try:
-                                        import json
-                                        result_data = json.loads(content_item.text)
-                                    except:
-                                        result_data = content_item.text
-                                else:
-                                    result_data = str(content_item)
-                            elif hasattr(result.content, 'text'):
-                                try:
-                                    import json
-                                    result_data = json.loads(result.content.text)
-                                except:
-                                    result_data = result.content.text
-                            else:
-                                result_data = str(result.content)
-                        else:
-                            result_data = str(result)
-                    
-                    # Метод 2: Через _call_tool (альтернативный метод)
-                    elif hasattr(mcp, '_call_tool'):
-                        result = await mcp._call_tool(tool_name, arguments)
-                        if isinstance(result, (dict, list, str, int, float, bool, type(None))):
-                            result_data = result
-                        else:
-                            result_data = str(result)
-                    
-                    # Метод 3: Прямой вызов через _server (если доступно)
-                    elif hasattr(mcp, '_server'):
-                        server = getattr(mcp, '_server')
-                        # Ищем инструмент в _server
-                        if hasattr(server, '_tools'):
-                            tools_dict = getattr(server, '_tools', {})
-                            if tool_name in tools_dict:
-                                tool_func = tools_dict[tool_name]
-                                # Вызываем функцию напрямую
-                                if asyncio.iscoroutinefunction(tool_func):
-                                    result_data = await tool_func(**arguments)
-                                else:
-                                    result_data = tool_func(**arguments)
-                            else:
-                                return JSONResponse({
-                                    "error": f"Tool '{tool_name}' not found"
-                                }, status_code=404)
-                        else:
-                            return JSONResponse({
-                                "error": "Tools dictionary not available"
-                            }, status_code=500)
-                    else:
-                        return JSONResponse({
-                            "error": "Tool calling method not available"
-                        }, status_code=500)
-                    
-                    # Убеждаемся, что result_data не None
-                    if result_data is None:
-                        result_data = {"message": "Tool executed but returned None"}
-                    
-                    return JSONResponse({
-                        "success": True,
-                        "tool_name": tool_name,
-                        "result": result_data
-                    })
-                except Exception as e:
-                    import traceback
-                    return JSONResponse({
-                        "success": False,
-                        "error": str(e),
-                        "traceback": traceback.format_exc()
-                    }, status_code=500)
-                    
-            except Exception as e:
-                import traceback
-                return JSONResponse({
-                    "error": f"Request parsing error: {str(e)}",
-                    "traceback": traceback.format_exc()
-                }, status_code=400)
-        
-        # Проверяем, является ли base_app Starlette приложением
-        if isinstance(base_app, Starlette):
-            # Если это Starlette, добавляем routes
-            base_app.routes.extend([
-                Route("/health", health_check, methods=["GET"]),
-                Route("/tools", list_tools_endpoint, methods=["GET"]),
-                Route("/api/call-tool", call_tool_endpoint, methods=["POST"]),
-                Route("/", root_endpoint, methods=["GET"]),
-            ])
-            return base_app
-        else:
-            # Если нет, создаем новое приложение с монтированием
-            mcp_path = "/sse" if os.getenv("MCP_TRANSPORT", "sse").lower() == "sse" else "/"
-            health_app = Starlette(routes=[
-                Route("/health", health_check, methods=["GET"]),
-                Route("/tools", list_tools_endpoint, methods=["GET"]),
-                Route("/api/call-tool", call_tool_endpoint, methods=["POST"]),
-                Route("/", root_endpoint, methods=["GET"]),
-                Mount(mcp_path, app=base_app),
-            ])
-            return health_app
-            
-    except ImportError as e:
-        logger.warning(f"Не удалось импортировать Starlette: {e}")
-        logger.warning("Health endpoints недоступны, но MCP сервер будет работать")
-        return base_app
+
+        try:
+            result_data = _EXTRACT(await _CALL_TOOL(tool_name, arguments))
+            result_cache.store(cache_key, result_data)
+
+            # Убеждаемся, что result_data не None
+            if result_data is None:
+                result_data = {"message": "Tool executed but returned None"}
+
+            return ORJSONResponse({
+                "success": True,
+                "tool_name": tool_name,
+                "result": result_data
+            })
+        except ToolNotFoundError:
+            return ORJSONResponse({
+                "error": f"Tool '{tool_name}' not found"
+            }, status_code=404)
+        except Exception as e:
+            logger.exception(f"Ошибка при вызове инструмента {tool_name}")
+            return ORJSONResponse({
+                "success": False,
+                "error": str(e),
+                "traceback": traceback.format_exc()
+            }, status_code=500)
+
+    except Exception as e:
+        logger.exception("Ошибка разбора запроса /api/call-tool")
+        return ORJSONResponse({
+            "error": f"Request parsing error: {str(e)}",
+            "traceback": traceback.format_exc()
+        }, status_code=400)
+
+
+# Route вызова инструментов не зависит от состояния при старте — создаётся при импорте
+_CALL_TOOL_ROUTE = Route("/api/call-tool", call_tool_endpoint, methods=["POST"])
+
+
+# Тела ответов, не зависящие от набора инструментов, сериализуются при импорте
+_STARTING_BODY = orjson.dumps({
+    "status": "starting",
+    "mode": CFG.mode,
+    "transport": CFG.transport
+})
+_ROOT_BODY = orjson.dumps({
+    "service": "MCP Server for EdTech",
+    "version": "0.3.3",
+    "status": "running",
+    "endpoints": {
+        "health": "/health",
+        "tools": "/tools",
+        "call_tool": "/api/call-tool",
+        "mcp": CFG.mcp_path
+    }
+})
+
+# /health опрашивается пробами оркестратора — отдаём байты напрямую.
+# До завершения регистрации инструментов сервер отвечает 503 (starting),
+# чтобы пробы готовности не направляли трафик раньше времени
+_HEALTH_APP = StaticJSONApp(_STARTING_BODY, status=503)
+
+def _tools_variants(body: bytes) -> Dict[str, Tuple[bytes, str]]:
+    """Тело /tools без сжатия и в gzip, каждое со своим ETag."""
+    etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+    return {
+        "plain": (body, f'"{etag}"'),
+        "gzip": (gzip.compress(body, compresslevel=6), f'"{etag}-gz"'),
+    }
+
+
+# Варианты ответа /tools, обновляются в _publish_tools_state()
+_TOOLS_BODIES: Dict[str, Tuple[bytes, str]] = _tools_variants(
+    orjson.dumps({"tools": [], "count": 0})
+)
+
+
+def _publish_tools_state() -> None:
+    """
+    Сериализация ответов /health и /tools по зарегистрированным инструментам.
+    
+    Список инструментов после регистрации не меняется, поэтому тела
+    сериализуются (и /tools сжимается) один раз, а не на каждый запрос.
+    """
+    _HEALTH_APP.set_body(orjson.dumps({
+        "status": "ok",
+        "tools_count": _TOOLS_COUNT,
+        "mode": CFG.mode,
+        "transport": CFG.transport
+    }))
+    _TOOLS_BODIES.update(_tools_variants(orjson.dumps({
+        "tools": TOOLS_SNAPSHOT,
+        "count": len(TOOLS_SNAPSHOT)
+    }, default=str)))
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Сравнение ETag с заголовком If-None-Match (список через запятую, W/, *)."""
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+async def list_tools_endpoint(request):
+    """Endpoint для просмотра зарегистрированных инструментов."""
+    gzipped = "gzip" in request.headers.get("accept-encoding", "")
+    body, etag = _TOOLS_BODIES["gzip" if gzipped else "plain"]
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "public, max-age=60",
+        "Vary": "Accept-Encoding"
+    }
+    
+    # Список не менялся с прошлого запроса клиента — тело не отправляем
+    if _etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+    
+    if gzipped:
+        headers["Content-Encoding"] = "gzip"
+    return Response(body, media_type="application/json", headers=headers)
+
+
+async def root_endpoint(request):
+    """Root endpoint."""
+    return Response(_ROOT_BODY, media_type="application/json")
+
+
+def _create_health_routes() -> List[Any]:
+    """Создание дополнительных endpoints для диагностики."""
+    return [
+        ExactRoute("/health", _HEALTH_APP, methods=["GET"]),
+        ExactRoute("/tools", list_tools_endpoint, methods=["GET"]),
+        _CALL_TOOL_ROUTE,
+        ExactRoute("/", root_endpoint, methods=["GET"]),
+    ]
+
+
+def _install_health_routes(app: Any) -> Any:
+    """Добавление диагностических routes в Starlette-приложение FastMCP."""
+    try:
+        app.routes.extend(_create_health_routes())
     except Exception as e:
         logger.warning(f"Не удалось создать health endpoints: {e}")
         logger.warning("MCP сервер будет работать без дополнительных endpoints")
         logger.debug("Traceback:", exc_info=True)
-        return base_app
+    return app
+
+
+def _register_tools_on_startup(app: Any) -> Any:
+    """
+    Запуск фоновой регистрации инструментов в lifespan приложения.
+    
+    Исходный lifespan FastMCP (менеджер сессий http_app) сохраняется
+    и выполняется внутри нового. При остановке закрывается общий
+    HTTP клиент инструментов.
+    """
+    inner_lifespan = app.router.lifespan_context
+    
+    @contextlib.asynccontextmanager
+    async def lifespan(lifespan_app):
+        task = asyncio.create_task(_register_tools_async())
+        try:
+            async with inner_lifespan(lifespan_app) as state:
+                yield state
+        finally:
+            if not task.done():
+                task.cancel()
+            # Общий HTTP клиент инструментов закрывается вместе с приложением
+            await close_http_client()
+    
+    app.router.lifespan_context = lifespan
+    return app
+
+
+def install_health_on_sse(app: Any) -> Any:
+    """Установка health endpoints в приложение mcp.sse_app()."""
+    return _install_health_routes(app)
+
+
+def install_health_on_http(app: Any) -> Any:
+    """
+    Установка health endpoints в приложение mcp.http_app().
+    
+    http_app() тоже Starlette-приложение, и его lifespan запускает менеджер
+    сессий — поэтому routes добавляются в него напрямую, а не через Mount
+    под новым приложением, которое потеряло бы этот lifespan.
+    """
+    return _install_health_routes(app)
+
+
+def _make_server(uvicorn: Any, config: Any) -> Any:
+    """
+    Создание uvicorn.Server с остановкой по SIGINT/SIGTERM через event loop.
+    
+    loop.add_signal_handler будит селектор через wakeup fd сразу после
+    сигнала, тогда как обработчик signal.signal выполняется только между
+    байткод-инструкциями основного потока. Где add_signal_handler
+    недоступен (Windows), остаётся стандартное поведение uvicorn.
+    """
+    signals = (signal.SIGINT, signal.SIGTERM)
+    
+    class LoopSignalServer(uvicorn.Server):
+        def _add_loop_handlers(self) -> bool:
+            loop = asyncio.get_running_loop()
+            try:
+                for sig in signals:
+                    loop.add_signal_handler(sig, self._on_signal, sig)
+            except (NotImplementedError, RuntimeError):
+                return False
+            return True
+        
+        def _on_signal(self, sig: int) -> None:
+            logger.info(f"Получен сигнал {sig}. Инициирую graceful shutdown...")
+            # Повторный сигнал переводит uvicorn в force_exit
+            self.handle_exit(sig, None)
+        
+        def install_signal_handlers(self) -> None:
+            # uvicorn < 0.29
+            if not self._add_loop_handlers():
+                super().install_signal_handlers()
+        
+        @contextlib.contextmanager
+        def capture_signals(self):
+            # uvicorn >= 0.29
+            if not self._add_loop_handlers():
+                with super().capture_signals():
+                    yield
+                return
+            try:
+                yield
+            finally:
+                loop = asyncio.get_running_loop()
+                for sig in signals:
+                    loop.remove_signal_handler(sig)
+    
+    return LoopSignalServer(config)
 
 
 if __name__ == "__main__":
     # Валидация конфигурации
-    validate_configuration()
+    settings = validate_configuration()
     
     # Режим работы: stdio (локально) или sse (удалённо через HTTP)
-    mode = os.getenv("MCP_MODE", "sse").lower()
-    
-    if mode == "stdio":
+    if CFG.mode == "stdio":
         # Локальный режим через standard input/output (для тестирования)
         logger.info("Запуск MCP сервера в режиме stdio (локально)")
         try:
+            _register_tools()
             check_tools_registration()
             mcp.run()
         except KeyboardInterrupt:
@@ -457,47 +808,27 @@ if __name__ == "__main__":
         # HTTP/SSE режим для удалённого подключения (Cloud.ru)
         import uvicorn
         
-        port = int(os.getenv("PORT", 8000))
-        host = os.getenv("HOST", "0.0.0.0")
-        
-        # Определяем тип транспорта (sse или http)
-        transport = os.getenv("MCP_TRANSPORT", "sse").lower()
-        
-        # Проверка регистрации инструментов перед запуском
-        check_tools_registration()
-        
-        # Глобальная переменная для graceful shutdown
-        shutdown_event = asyncio.Event()
-        
-        def signal_handler(signum, frame):
-            """Обработчик сигналов для graceful shutdown."""
-            logger.info(f"Получен сигнал {signum}. Инициирую graceful shutdown...")
-            shutdown_event.set()
-        
-        # Регистрация обработчиков сигналов
-        signal.signal(signal.SIGINT, signal_handler)
-        signal.signal(signal.SIGTERM, signal_handler)
+        port = settings.port
+        host = CFG.host
+        transport = CFG.transport
         
         try:
             if transport == "sse":
                 logger.info("Запуск MCP сервера в режиме SSE")
                 logger.info(f"Слушаю на {host}:{port}")
-                logger.info(f"Endpoint: http://{host}:{port}/sse")
-                # Используем старый метод sse_app() (работает, но показывает deprecation warning)
-                # Подавляем предупреждение, так как новый API требует дополнительные параметры
-                import warnings
-                with warnings.catch_warnings():
-                    warnings.filterwarnings("ignore", category=DeprecationWarning)
-                    app = mcp.sse_app()
+                logger.info(f"Endpoint: http://{host}:{port}{CFG.mcp_path}")
+                # Используем старый метод sse_app() (работает, но показывает deprecation warning,
+                # подавленный фильтром в начале модуля)
+                app = install_health_on_sse(mcp.sse_app())
             else:
                 logger.info("Запуск MCP сервера в режиме HTTP")
                 logger.info(f"Слушаю на {host}:{port}")
-                logger.info(f"Endpoint: http://{host}:{port}")
+                logger.info(f"Endpoint: http://{host}:{port}{CFG.mcp_path}")
                 # Получаем HTTP приложение из FastMCP (вызываем метод)
-                app = mcp.http_app()
+                app = install_health_on_http(mcp.http_app())
             
-            # Добавляем health check endpoints
-            app = create_health_endpoints(app)
+            # Инструменты регистрируются в фоне после старта uvicorn
+            app = _register_tools_on_startup(app)
             
             logger.info(f"Health check: http://{host}:{port}/health")
             logger.info(f"Tools list: http://{host}:{port}/tools")
@@ -509,16 +840,25 @@ if __name__ == "__main__":
         
         # Запуск через uvicorn с приложением FastMCP
         try:
+            # uvloop и httptools — C-реализации event loop и HTTP-парсера.
+            # "auto" выбирает их, если пакеты установлены, иначе asyncio и h11
+            # (Windows, урезанный образ) — без ImportError при старте
             config = uvicorn.Config(
                 app,
                 host=host,
                 port=port,
-                log_level="info",
-                access_log=True,
+                loop="auto",
+                http="auto",
+                # WebSocket не используется ни одним транспортом MCP
+                ws="none",
+                # Access log пишет строку на каждый /health и SSE-запрос —
+                # в продакшене отключён, включается UVICORN_ACCESS_LOG=1
+                log_level="warning",
+                access_log=CFG.access_log,
                 timeout_keep_alive=30,
                 timeout_graceful_shutdown=10
             )
-            server = uvicorn.Server(config)
+            server = _make_server(uvicorn, config)
             
             # Запуск сервера
             server.run()
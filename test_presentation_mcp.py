@@ -3,52 +3,84 @@
 Использует Aspose Slides для создания презентаций локально.
 """
 import asyncio
+import sys
 import os
 from typing import Dict, List
 
+import httpx
+from fastmcp import Client
+
+from mcp_instance import mcp
+from tools.aspose_slides_module import (
+    Slide,
+    _ensure_exports_dir,
+    _generate_filename,
+    build_presentation
+)
+from tools.create_presentation import _URL_PREFIXES
+from tools.http_client import close_http_client, get_http_client
+
+try:
+    from uvloop import run as _run
+except ImportError:
+    _run = asyncio.run
+
+# Stop after the first failed test: --fail-fast or FAIL_FAST=1
+FAIL_FAST = "--fail-fast" in sys.argv or os.getenv("FAIL_FAST") == "1"
+
+# Host of the image used in SLIDES_WITH_IMAGE
+IMAGE_HOST_URL = "https://images.unsplash.com/"
+
+# Arguments that create_presentation must reject (label, arguments)
+_VALIDATION_CASES = (
+    ("Empty title", {"title": "", "slides": [{"title": "Slide", "text": "Text"}]}),
+    ("Empty slides list", {"title": "Test", "slides": []}),
+    ("Non-dict slide", {"title": "Test", "slides": ["not a dict"]}),
+    ("Empty slide (no title/text)", {"title": "Test", "slides": [{"title": "", "text": ""}]}),
+    ("Invalid image_url", {"title": "Test", "slides": [
+        {"title": "Slide", "text": "Text", "image_url": "not-a-url"}
+    ]}),
+)
+
+# Slide templates shared by the build tests (immutable tuples, built once)
+SLIDES_BASIC = (
+    Slide(title="Slide 1", text="This is slide 1 content"),
+    Slide(title="Slide 2", text="This is slide 2 content"),
+)
+SLIDES_WITH_IMAGE = (
+    Slide(title="Slide 1", text="This slide has no image"),
+    Slide(title="Slide 2", text="This slide has an image",
+          image_url="https://images.unsplash.com/photo-1451187580459-43490279c0fa?w=400"),
+)
+
 
 async def test_validation():
     """Тест валидации входных данных."""
-    print("=" * 50)
-    print("Test: create_presentation (validation)")
-    print("=" * 50)
+    sys.stdout.write("\n".join([
+        "=" * 50,
+        "Test: create_presentation (validation)",
+        "=" * 50,
+    ]) + "\n")
     
-    # Test empty title handling
-    if not "":
-        print("[OK] Empty title would be rejected")
-    
-    # Test empty slides handling
-    if not []:
-        print("[OK] Empty slides list would be rejected")
-    
-    # Test invalid slide structure
-    invalid_slide = "not a dict"
-    if not isinstance(invalid_slide, dict):
-        print("[OK] Non-dict slide would be rejected")
-    
-    # Test slide without title and text
-    empty_slide = {"title": "", "text": ""}
-    if not empty_slide.get("title") and not empty_slide.get("text"):
-        print("[OK] Empty slide (no title/text) would be rejected")
-    
-    # Test invalid image_url
-    bad_url = "not-a-url"
-    if not bad_url.startswith(("http://", "https://")):
-        print("[OK] Invalid image_url would be rejected")
+    async with Client(mcp) as client:
+        for label, arguments in _VALIDATION_CASES:
+            result = await client.call_tool("create_presentation", arguments, raise_on_error=False)
+            # Either the argument types fail validation (is_error)
+            # or the tool itself returns {"error": ...}
+            rejected = result.is_error or "error" in (result.structured_content or {})
+            assert rejected, f"{label} was accepted"
+            print(f"[OK] {label} rejected")
     
     return True
 
 
 async def test_aspose_slides_utils():
     """Тест вспомогательных функций Aspose Slides."""
-    print("\n" + "=" * 50)
-    print("Test: aspose_slides_module utils")
-    print("=" * 50)
-    
-    from tools.aspose_slides_module import (
-        _generate_filename,
-        _ensure_exports_dir
-    )
+    sys.stdout.write("\n".join([
+        "\n" + "=" * 50,
+        "Test: aspose_slides_module utils",
+        "=" * 50,
+    ]) + "\n")
     
     # Test filename generation
     filename = _generate_filename("Test Presentation")
@@ -68,19 +100,16 @@ async def test_build_presentation():
     """
     Тест создания презентации через Aspose Slides.
     """
-    print("\n" + "=" * 50)
-    print("Test: build_presentation (Aspose Slides)")
-    print("=" * 50)
-    
-    from tools.aspose_slides_module import build_presentation
+    sys.stdout.write("\n".join([
+        "\n" + "=" * 50,
+        "Test: build_presentation (Aspose Slides)",
+        "=" * 50,
+    ]) + "\n")
     
     # Test basic presentation creation
     result = await build_presentation(
         title="Test Presentation",
-        slides_data=[
-            {"title": "Slide 1", "text": "This is slide 1 content"},
-            {"title": "Slide 2", "text": "This is slide 2 content"}
-        ]
+        slides_data=list(SLIDES_BASIC)
     )
     
     if "error" in result:
@@ -88,11 +117,13 @@ async def test_build_presentation():
         print(f"[FAIL] Error: {error_msg}...")
         return False
     
-    print(f"[OK] Presentation created!")
-    print(f"   File path: {result.get('file_path', 'N/A')}")
-    print(f"   File name: {result.get('file_name', 'N/A')}")
-    print(f"   Slides: {result.get('slides_count', 'N/A')}")
-    print(f"   File size: {result.get('file_size', 'N/A')} bytes")
+    sys.stdout.write("\n".join([
+        f"[OK] Presentation created!",
+        f"   File path: {result.get('file_path', 'N/A')}",
+        f"   File name: {result.get('file_name', 'N/A')}",
+        f"   Slides: {result.get('slides_count', 'N/A')}",
+        f"   File size: {result.get('file_size', 'N/A')} bytes",
+    ]) + "\n")
     
     # Verify file exists
     file_path = result.get('file_path', '')
@@ -109,20 +140,16 @@ async def test_build_presentation_with_image():
     """
     Тест создания презентации с изображением.
     """
-    print("\n" + "=" * 50)
-    print("Test: build_presentation (with image)")
-    print("=" * 50)
-    
-    from tools.aspose_slides_module import build_presentation
+    sys.stdout.write("\n".join([
+        "\n" + "=" * 50,
+        "Test: build_presentation (with image)",
+        "=" * 50,
+    ]) + "\n")
     
     # Test presentation with image
     result = await build_presentation(
         title="Presentation With Image",
-        slides_data=[
-            {"title": "Slide 1", "text": "This slide has no image"},
-            {"title": "Slide 2", "text": "This slide has an image", 
-             "image_url": "https://images.unsplash.com/photo-1451187580459-43490279c0fa?w=400"}
-        ]
+        slides_data=list(SLIDES_WITH_IMAGE)
     )
     
     if "error" in result:
@@ -132,19 +159,23 @@ async def test_build_presentation_with_image():
         print("[OK] Error handled gracefully")
         return True
     
-    print(f"[OK] Presentation with image created!")
-    print(f"   File path: {result.get('file_path', 'N/A')}")
-    print(f"   Slides: {result.get('slides_count', 'N/A')}")
-    print(f"   File size: {result.get('file_size', 'N/A')} bytes")
+    sys.stdout.write("\n".join([
+        f"[OK] Presentation with image created!",
+        f"   File path: {result.get('file_path', 'N/A')}",
+        f"   Slides: {result.get('slides_count', 'N/A')}",
+        f"   File size: {result.get('file_size', 'N/A')} bytes",
+    ]) + "\n")
     
     return True
 
 
 async def test_slide_data_structure():
     """Тест структуры данных слайдов."""
-    print("\n" + "=" * 50)
-    print("Test: Slide data structure")
-    print("=" * 50)
+    sys.stdout.write("\n".join([
+        "\n" + "=" * 50,
+        "Test: Slide data structure",
+        "=" * 50,
+    ]) + "\n")
     
     # Valid slide structures
     valid_slides: List[Dict] = [
@@ -154,24 +185,25 @@ async def test_slide_data_structure():
         {"title": "With Image", "text": "Content", "image_url": "https://example.com/img.jpg"},
     ]
     
-    for i, slide in enumerate(valid_slides):
-        has_content = slide.get("title") or slide.get("text")
-        has_valid_url = not slide.get("image_url") or slide.get("image_url", "").startswith("https://")
-        
-        if has_content and has_valid_url:
-            print(f"[OK] Slide {i+1} structure is valid")
-        else:
-            print(f"[FAIL] Slide {i+1} structure is invalid")
-            return False
+    def _ok(slide: Slide) -> bool:
+        has_content = bool(slide.title or slide.text)
+        has_valid_url = slide.image_url is None or slide.image_url.startswith(_URL_PREFIXES)
+        return has_content and has_valid_url
     
-    return True
+    # Same typed conversion that build_presentation applies to its input
+    results = [_ok(Slide.from_dict(slide)) for slide in valid_slides]
+    print(f"[{'OK' if all(results) else 'FAIL'}] {sum(results)}/{len(results)} slide structures valid")
+    
+    return all(results)
 
 
 async def test_response_format():
     """Тест формата ответа."""
-    print("\n" + "=" * 50)
-    print("Test: Response format")
-    print("=" * 50)
+    sys.stdout.write("\n".join([
+        "\n" + "=" * 50,
+        "Test: Response format",
+        "=" * 50,
+    ]) + "\n")
     
     # Expected success response format
     success_response = {
@@ -199,9 +231,11 @@ async def test_response_format():
 
 async def test_create_presentation_import():
     """Тест импорта MCP инструмента create_presentation."""
-    print("\n" + "=" * 50)
-    print("Test: create_presentation MCP import")
-    print("=" * 50)
+    sys.stdout.write("\n".join([
+        "\n" + "=" * 50,
+        "Test: create_presentation MCP import",
+        "=" * 50,
+    ]) + "\n")
     
     try:
         from tools.create_presentation import create_presentation
@@ -221,23 +255,59 @@ async def test_create_presentation_import():
         return False
 
 
+async def _warm_up_image_host() -> None:
+    """Open a pooled connection to the image host before the image test."""
+    try:
+        await get_http_client().head(IMAGE_HOST_URL, timeout=5.0)
+    except httpx.HTTPError:
+        # Network may be unavailable; the image test handles that itself
+        pass
+
+
 async def main():
     """Запуск всех тестов."""
     print("\n[TEST] Running create_presentation tests (Aspose Slides)\n")
     
+    # Warm up the shared HTTP client (DNS + TLS to the image host)
+    # while the independent tests run
+    warmup = asyncio.create_task(_warm_up_image_host())
+    
+    # Independent tests run concurrently; a failed assert counts as a failure
+    # instead of aborting the whole run
+    outcomes = await asyncio.gather(
+        test_validation(),
+        test_aspose_slides_utils(),
+        test_slide_data_structure(),
+        test_response_format(),
+        test_create_presentation_import(),
+        return_exceptions=True,
+    )
     results = []
-    results.append(await test_validation())
-    results.append(await test_aspose_slides_utils())
-    results.append(await test_slide_data_structure())
-    results.append(await test_response_format())
-    results.append(await test_build_presentation())
-    results.append(await test_build_presentation_with_image())
-    results.append(await test_create_presentation_import())
+    for outcome in outcomes:
+        if isinstance(outcome, BaseException):
+            print(f"[FAIL] {type(outcome).__name__}: {outcome}")
+            results.append(False)
+        else:
+            results.append(outcome)
+    # Build tests write to the exports directory, so they run one by one;
+    # with fail-fast they are skipped once anything has failed
+    serial_tests = (test_build_presentation, test_build_presentation_with_image)
+    for test in serial_tests:
+        if FAIL_FAST and not all(results):
+            print("\n[STOP] Fail-fast: skipping remaining tests")
+            break
+        if test is test_build_presentation_with_image:
+            await warmup
+        results.append(await test())
+    warmup.cancel()
+    await close_http_client()
     
-    print("\n" + "=" * 50)
-    print(f"[RESULT] {sum(results)}/{len(results)} tests passed")
-    print("=" * 50)
+    sys.stdout.write("\n".join([
+        "\n" + "=" * 50,
+        f"[RESULT] {sum(results)}/{len(results)} tests passed",
+        "=" * 50,
+    ]) + "\n")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    _run(main())
@@ -5,6 +5,19 @@ Note: for full testing, configured Google Calendar API is required.
 import asyncio
 from datetime import datetime, timedelta
 
+from tools.google_calendar import calculate_end_time, create_calendar_event, parse_iso_datetime
+from tools.schedule_lesson import schedule_lesson as sl_tool  # noqa: F401
+
+try:
+    from uvloop import run as _run
+except ImportError:
+    _run = asyncio.run
+
+# Start of a test lesson: tomorrow at 14:00, computed once for all tests
+_TOMORROW_ISO = (
+    datetime.now().replace(hour=14, minute=0, second=0, microsecond=0) + timedelta(days=1)
+).strftime("%Y-%m-%dT%H:%M:%S")
+
 
 async def test_schedule_lesson_validation():
     """Test validacii vhodnyh dannyh."""
@@ -12,14 +25,9 @@ async def test_schedule_lesson_validation():
     print("Test: schedule_lesson (validation)")
     print("=" * 50)
     
-    # Import the underlying function components
-    from tools.schedule_lesson import schedule_lesson as sl_tool
-    
     # We can't call the decorated tool directly, so we test the validation logic
     # by testing the google_calendar utilities
     
-    from tools.google_calendar import calculate_end_time, parse_iso_datetime
-    
     # Test empty summary handling (validation)
     if not "":
         print("[OK] Empty summary would be rejected")
@@ -41,16 +49,11 @@ async def test_schedule_lesson_dry_run():
     print("=" * 50)
     
     # Test that we can import and the calendar utility functions work
-    from tools.google_calendar import create_calendar_event, calculate_end_time
-    
     # We can test the create_calendar_event function which will fail gracefully
     # without proper Google credentials
-    tomorrow = datetime.now() + timedelta(days=1)
-    start_time = tomorrow.replace(hour=14, minute=0, second=0, microsecond=0)
-    
     result = await create_calendar_event(
         summary="Test lesson: Python intro",
-        start_iso=start_time.strftime("%Y-%m-%dT%H:%M:%S"),
+        start_iso=_TOMORROW_ISO,
         timezone="Europe/Moscow",
         description="Lesson plan:\n- Variables\n- Data types",
         location="https://meet.google.com/test-link"
@@ -76,8 +79,6 @@ async def test_google_calendar_utils():
     print("Test: google_calendar utils")
     print("=" * 50)
     
-    from tools.google_calendar import calculate_end_time, parse_iso_datetime
-    
     # Test calculate_end_time
     start = "2025-12-10T15:00:00"
     end = calculate_end_time(start, 60)
@@ -94,10 +95,21 @@ async def main():
     """Zapusk vseh testov."""
     print("\n[TEST] Running schedule_lesson tests\n")
     
+    # Tests are independent of each other, run them concurrently;
+    # an exception counts as a failure instead of aborting the whole run
+    outcomes = await asyncio.gather(
+        test_schedule_lesson_validation(),
+        test_google_calendar_utils(),
+        test_schedule_lesson_dry_run(),
+        return_exceptions=True,
+    )
     results = []
-    results.append(await test_schedule_lesson_validation())
-    results.append(await test_google_calendar_utils())
-    results.append(await test_schedule_lesson_dry_run())
+    for outcome in outcomes:
+        if isinstance(outcome, BaseException):
+            print(f"[FAIL] {type(outcome).__name__}: {outcome}")
+            results.append(False)
+        else:
+            results.append(outcome)
     
     print("\n" + "=" * 50)
     print(f"[RESULT] {sum(results)}/{len(results)} tests passed")
@@ -105,5 +117,5 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    _run(main())
 
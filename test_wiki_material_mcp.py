@@ -2,15 +2,26 @@
 Testy dlya wiki_get_material MCP tool.
 """
 import asyncio
+import os
+import sys
 import httpx
 from tools.wiki_get_material import (
     _search_wiki,
     _get_article_content,
+    _search_and_fetch,
     _parse_sections,
     _apply_max_chars,
     WIKI_SOURCES
 )
 
+try:
+    from uvloop import run as _run
+except ImportError:
+    _run = asyncio.run
+
+# Stop after the first failed test: --fail-fast or FAIL_FAST=1
+FAIL_FAST = "--fail-fast" in sys.argv or os.getenv("FAIL_FAST") == "1"
+
 
 async def test_search_wiki():
     """Test poiska statji v wiki."""
@@ -95,9 +106,9 @@ async def test_apply_max_chars():
     
     result = _apply_max_chars(test_data, 800)
     
-    total_chars = len(result.get("summary", ""))
-    for section in result.get("sections", []):
-        total_chars += len(section.get("content", ""))
+    total_chars = len(result.get("summary", "")) + sum(
+        len(section.get("content", "")) for section in result.get("sections", [])
+    )
     
     print(f"[OK] Original total: 1500 chars")
     print(f"[OK] After truncation: {total_chars} chars")
@@ -116,38 +127,51 @@ async def test_full_flow():
     topic = "Python"
     max_chars = 2000
     
-    sources = WIKI_SOURCES.get(language, [])
+    sources = WIKI_SOURCES.get(language, ())
     
-    for source in sources:
-        search_result = await _search_wiki(source["url"], topic)
-        if not search_result:
-            print(f"[SKIP] {source['name']}: no results")
-            continue
-        
-        article = await _get_article_content(source["url"], search_result["title"])
+    async def _probe(name, url):
+        """Poisk i zagruzka stat'i v odnom istochnike (odin zapros)."""
+        article = await _search_and_fetch(url, topic)
         if not article or not article.get("extract"):
-            print(f"[SKIP] {source['name']}: no content")
-            continue
-        
-        parsed = _parse_sections(article["extract"], article["title"])
-        
-        if parsed["summary"] or parsed["sections"]:
-            result = {
-                "title": article["title"],
-                "summary": parsed["summary"],
-                "sections": parsed["sections"],
-                "source_urls": [article.get("url", "")],
-                "source": source["name"]
-            }
-            
-            result = _apply_max_chars(result, max_chars)
+            print(f"[SKIP] {name}: no results")
+            return None
+        return name, article
+    
+    # Istochniki oprashivajutsja parallel'no; beretsja pervyj uspeshnyj
+    # otvet, ostal'nye zaprosy otmenjajutsja
+    tasks = [asyncio.create_task(_probe(name, url)) for name, url in sources]
+    try:
+        for fut in asyncio.as_completed(tasks):
+            try:
+                probed = await fut
+            except Exception:
+                continue
+            if not probed:
+                continue
             
-            print(f"[OK] Source: {result.get('source', 'N/A')}")
-            print(f"[OK] Title: {result.get('title', 'N/A')}")
-            print(f"[OK] Summary: {len(result.get('summary', ''))} chars")
-            print(f"[OK] Sections: {len(result.get('sections', []))}")
+            source_name, article = probed
+            parsed = _parse_sections(article["extract"], article["title"])
             
-            return True
+            if parsed["summary"] or parsed["sections"]:
+                result = {
+                    "title": article["title"],
+                    "summary": parsed["summary"],
+                    "sections": parsed["sections"],
+                    "source_urls": [article.get("url", "")],
+                    "source": source_name
+                }
+                
+                result = _apply_max_chars(result, max_chars)
+                
+                print(f"[OK] Source: {result.get('source', 'N/A')}")
+                print(f"[OK] Title: {result.get('title', 'N/A')}")
+                print(f"[OK] Summary: {len(result.get('summary', ''))} chars")
+                print(f"[OK] Sections: {len(result.get('sections', []))}")
+                
+                return True
+    finally:
+        for task in tasks:
+            task.cancel()
     
     print("[FAIL] No material found in any source")
     return False
@@ -158,11 +182,19 @@ async def main():
     print("\n[TEST] Running wiki_get_material tests\n")
     
     results = []
-    results.append(await test_search_wiki())
-    results.append(await test_get_article_content())
-    results.append(await test_parse_sections())
-    results.append(await test_apply_max_chars())
-    results.append(await test_full_flow())
+    tests = (
+        test_search_wiki,
+        test_get_article_content,
+        test_parse_sections,
+        test_apply_max_chars,
+        test_full_flow,
+    )
+    for test in tests:
+        passed = await test()
+        results.append(passed)
+        if FAIL_FAST and not passed:
+            print("\n[STOP] Fail-fast: skipping remaining tests")
+            break
     
     print("\n" + "=" * 50)
     print(f"[RESULT] {sum(results)}/{len(results)} tests passed")
@@ -170,4 +202,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    _run(main())
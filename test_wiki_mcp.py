@@ -3,29 +3,39 @@
 Включает тестирование поиска статей и получения текста из Wikipedia.
 """
 import asyncio
-import json
+# orjson быстрее; без него используется стандартный json
+try:
+    import orjson as _json
+except ImportError:
+    import json as _json
+import traceback
 from fastmcp import Client
 from mcp_instance import mcp
 
 # Импорты инструментов для регистрации декораторов
 from tools.get_text_from_wiki import search_article, get_text_from_wiki  # noqa: F401
 
+try:
+    from uvloop import run as _run
+except ImportError:
+    _run = asyncio.run
+
 
 def extract_result(result_obj):
     """Извлекает данные из результата FastMCP."""
     # Если это TextContent, парсим JSON из text
     if hasattr(result_obj, 'text'):
         try:
-            return json.loads(result_obj.text)
-        except json.JSONDecodeError:
+            return _json.loads(result_obj.text)
+        except _json.JSONDecodeError:
             # Если не JSON, возвращаем как строку
             return result_obj.text
     # Если это список с TextContent
     if isinstance(result_obj, list) and len(result_obj) > 0:
         if hasattr(result_obj[0], 'text'):
             try:
-                return json.loads(result_obj[0].text)
-            except json.JSONDecodeError:
+                return _json.loads(result_obj[0].text)
+            except _json.JSONDecodeError:
                 return result_obj[0].text
         return result_obj[0] if len(result_obj) == 1 else result_obj
     # Если это словарь или список напрямую
@@ -42,136 +52,140 @@ def extract_result(result_obj):
     return result_obj
 
 
-async def test_wiki():
+async def test_wiki(client):
     """Тестирование инструментов search_article и get_text_from_wiki."""
     print("Тестирование Wikipedia-MCP...")
     
     try:
-        async with Client(mcp) as client:
-            # Тест 1: Поиск статьи
-            print("\nТест 1: Поиск статьи по запросу 'Python'...")
-            search_result_obj = await client.call_tool("search_article", {
-                "query": "Python",
-                "language": "ru"
-            })
-            search_result = extract_result(search_result_obj)
-            
-            if not search_result:
-                print("ОШИБКА: Пустой результат поиска")
-                return False
-            
-            # search_article возвращает строку
-            if not isinstance(search_result, str):
-                print(f"ОШИБКА: Ожидалась строка, получен {type(search_result)}")
-                return False
-            
-            # Проверка, что результат не является сообщением об ошибке
-            if "Ошибка" in search_result or "Не найдено результатов" in search_result:
-                print(f"ПРЕДУПРЕЖДЕНИЕ: {search_result}")
-                # Это может быть нормально, если статья не найдена, но продолжим тест
-            else:
-                print(f"OK: Результат поиска получен")
-                print(f"   - Длина результата: {len(search_result)} символов")
-                if len(search_result) > 0:
-                    print(f"   - Первые 100 символов: {search_result[:100]}...")
-            
-            # Тест 2: Получение текста статьи
-            print("\nТест 2: Получение текста статьи 'Python'...")
-            get_text_result_obj = await client.call_tool("get_text_from_wiki", {
-                "title": "Python",
-                "language": "ru"
-            })
-            get_text_result = extract_result(get_text_result_obj)
-            
-            if not get_text_result:
-                print("ОШИБКА: Пустой результат получения текста")
-                return False
-            
-            # get_text_from_wiki теперь всегда возвращает List[str]
-            if not isinstance(get_text_result, list):
-                print(f"ОШИБКА: Ожидался список строк, получен {type(get_text_result)}")
-                return False
-            
-            if len(get_text_result) == 0:
-                print("ОШИБКА: Пустой список результатов")
-                return False
-            
-            # Проверка, что первый элемент не является сообщением об ошибке
-            first_paragraph = get_text_result[0] if isinstance(get_text_result[0], str) else str(get_text_result[0])
-            if "Ошибка" in first_paragraph or "не найдена" in first_paragraph.lower() or "не найдено" in first_paragraph.lower():
-                print(f"ПРЕДУПРЕЖДЕНИЕ: {first_paragraph[:200]}")
-                return False
-            
-            # Проверка, что текст не пустой
-            total_length = sum(len(p) for p in get_text_result if isinstance(p, str))
-            if total_length < 50:
-                print(f"ОШИБКА: Текст статьи слишком короткий ({total_length} символов)")
-                return False
-            
-            print(f"OK: Текст статьи получен")
-            print(f"   - Количество абзацев: {len(get_text_result)}")
-            print(f"   - Общая длина текста: {total_length} символов")
-            print(f"   - Первый абзац (первые 150 символов): {first_paragraph[:150]}...")
-            
-            # Тест 3: Получение текста статьи по pageid
-            print("\nТест 3: Получение текста статьи по pageid...")
-            # Используем известный pageid для статьи Python на русской Википедии
-            # pageid для статьи "Python" на ru.wikipedia.org обычно около 12345
-            # Но для надежности используем другой известный pageid или пропустим, если не уверены
-            # Попробуем с pageid для статьи "Python" (примерно 12345, но может отличаться)
-            get_text_by_id_result_obj = await client.call_tool("get_text_from_wiki", {
-                "pageid": 12345,
-                "language": "ru"
-            })
-            get_text_by_id_result = extract_result(get_text_by_id_result_obj)
-            
-            # Проверяем результат (может быть ошибка, если pageid неверный)
-            if isinstance(get_text_by_id_result, list):
-                if len(get_text_by_id_result) > 0:
-                    first_item = get_text_by_id_result[0]
-                    if isinstance(first_item, str):
-                        if "Ошибка" in first_item or "не найдена" in first_item.lower():
-                            print(f"INFO: Тест с pageid пропущен (pageid может быть неверным): {first_item[:100]}")
-                        else:
-                            total_len = sum(len(p) for p in get_text_by_id_result if isinstance(p, str))
-                            print(f"OK: Текст статьи получен по pageid")
-                            print(f"   - Количество абзацев: {len(get_text_by_id_result)}")
-                            print(f"   - Длина текста: {total_len} символов")
-                else:
-                    print(f"INFO: Пустой результат для pageid")
+        # Тест 1: Поиск статьи
+        print("\nТест 1: Поиск статьи по запросу 'Python'...")
+        search_result_obj = await client.call_tool("search_article", {
+            "query": "Python",
+            "language": "ru"
+        })
+        search_result = extract_result(search_result_obj)
+        
+        if not search_result:
+            print("ОШИБКА: Пустой результат поиска")
+            return False
+        
+        # search_article возвращает строку
+        if not isinstance(search_result, str):
+            print(f"ОШИБКА: Ожидалась строка, получен {type(search_result)}")
+            return False
+        
+        # Проверка, что результат не является сообщением об ошибке
+        if "Ошибка" in search_result or "Не найдено результатов" in search_result:
+            print(f"ПРЕДУПРЕЖДЕНИЕ: {search_result}")
+            # Это может быть нормально, если статья не найдена, но продолжим тест
+        else:
+            print(f"OK: Результат поиска получен")
+            print(f"   - Длина результата: {len(search_result)} символов")
+            if len(search_result) > 0:
+                print(f"   - Первые 100 символов: {search_result[:100]}...")
+        
+        # Тест 2: Получение текста статьи
+        print("\nТест 2: Получение текста статьи 'Python'...")
+        get_text_result_obj = await client.call_tool("get_text_from_wiki", {
+            "title": "Python",
+            "language": "ru"
+        })
+        get_text_result = extract_result(get_text_result_obj)
+        
+        if not get_text_result:
+            print("ОШИБКА: Пустой результат получения текста")
+            return False
+        
+        # get_text_from_wiki теперь всегда возвращает List[str]
+        if not isinstance(get_text_result, list):
+            print(f"ОШИБКА: Ожидался список строк, получен {type(get_text_result)}")
+            return False
+        
+        if len(get_text_result) == 0:
+            print("ОШИБКА: Пустой список результатов")
+            return False
+        
+        # Проверка, что первый элемент не является сообщением об ошибке
+        first_paragraph = get_text_result[0] if isinstance(get_text_result[0], str) else str(get_text_result[0])
+        if "Ошибка" in first_paragraph or "не найдена" in first_paragraph.lower() or "не найдено" in first_paragraph.lower():
+            print(f"ПРЕДУПРЕЖДЕНИЕ: {first_paragraph[:200]}")
+            return False
+        
+        # Проверка, что текст не пустой
+        total_length = sum(len(p) for p in get_text_result if isinstance(p, str))
+        if total_length < 50:
+            print(f"ОШИБКА: Текст статьи слишком короткий ({total_length} символов)")
+            return False
+        
+        print(f"OK: Текст статьи получен")
+        print(f"   - Количество абзацев: {len(get_text_result)}")
+        print(f"   - Общая длина текста: {total_length} символов")
+        print(f"   - Первый абзац (первые 150 символов): {first_paragraph[:150]}...")
+        
+        # Тест 3: Получение текста статьи по pageid
+        print("\nТест 3: Получение текста статьи по pageid...")
+        # Используем известный pageid для статьи Python на русской Википедии
+        # pageid для статьи "Python" на ru.wikipedia.org обычно около 12345
+        # Но для надежности используем другой известный pageid или пропустим, если не уверены
+        # Попробуем с pageid для статьи "Python" (примерно 12345, но может отличаться)
+        get_text_by_id_result_obj = await client.call_tool("get_text_from_wiki", {
+            "pageid": 12345,
+            "language": "ru"
+        })
+        get_text_by_id_result = extract_result(get_text_by_id_result_obj)
+        
+        # Проверяем результат (может быть ошибка, если pageid неверный)
+        if isinstance(get_text_by_id_result, list):
+            if len(get_text_by_id_result) > 0:
+                first_item = get_text_by_id_result[0]
+                if isinstance(first_item, str):
+                    if "Ошибка" in first_item or "не найдена" in first_item.lower():
+                        print(f"INFO: Тест с pageid пропущен (pageid может быть неверным): {first_item[:100]}")
+                    else:
+                        total_len = sum(len(p) for p in get_text_by_id_result if isinstance(p, str))
+                        print(f"OK: Текст статьи получен по pageid")
+                        print(f"   - Количество абзацев: {len(get_text_by_id_result)}")
+                        print(f"   - Длина текста: {total_len} символов")
             else:
-                print(f"INFO: Неожиданный формат результата для pageid: {type(get_text_by_id_result)}")
-            
-            # Тест 4: Поиск статьи на английском языке
-            print("\nТест 4: Поиск статьи на английском языке...")
-            search_en_result_obj = await client.call_tool("search_article", {
-                "query": "Python",
-                "language": "en"
-            })
-            search_en_result = extract_result(search_en_result_obj)
-            
-            if search_en_result and isinstance(search_en_result, str):
-                if "Ошибка" not in search_en_result and "Не найдено результатов" not in search_en_result:
-                    print(f"OK: Поиск на английском языке работает")
-                else:
-                    print(f"INFO: {search_en_result[:100]}")
+                print(f"INFO: Пустой результат для pageid")
+        else:
+            print(f"INFO: Неожиданный формат результата для pageid: {type(get_text_by_id_result)}")
+        
+        # Тест 4: Поиск статьи на английском языке
+        print("\nТест 4: Поиск статьи на английском языке...")
+        search_en_result_obj = await client.call_tool("search_article", {
+            "query": "Python",
+            "language": "en"
+        })
+        search_en_result = extract_result(search_en_result_obj)
+        
+        if search_en_result and isinstance(search_en_result, str):
+            if "Ошибка" not in search_en_result and "Не найдено результатов" not in search_en_result:
+                print(f"OK: Поиск на английском языке работает")
             else:
-                print(f"INFO: Результат поиска на английском: {type(search_en_result)}")
-            
-            print("\nOK: Wikipedia MCP тест пройден успешно!")
-            return True
+                print(f"INFO: {search_en_result[:100]}")
+        else:
+            print(f"INFO: Результат поиска на английском: {type(search_en_result)}")
         
+        print("\nOK: Wikipedia MCP тест пройден успешно!")
+        return True
+    
     except AssertionError as e:
         print(f"ОШИБКА проверки: {e}")
         return False
     except Exception as e:
         print(f"ОШИБКА: Неожиданная ошибка: {e}")
-        import traceback
         traceback.print_exc()
         return False
 
 
+async def main():
+    """Запуск тестов через одно подключение клиента."""
+    async with Client(mcp) as client:
+        return await test_wiki(client)
+
+
 if __name__ == "__main__":
-    success = asyncio.run(test_wiki())
+    success = _run(main())
     exit(0 if success else 1)
 
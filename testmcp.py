@@ -3,112 +3,96 @@
 Использует /api/call-tool endpoint для вызова инструментов.
 """
 import httpx
-import json
+import orjson
 import asyncio
+import traceback
 
 # URL вашего Container App
 MCP_SERVER_URL = "https://container-app-mrizf-stems.containerapps.ru"
 
-async def call_mcp_tool(tool_name: str, **kwargs):
+# Вызовы инструментов (не требуют API ключей для проверки структуры):
+# номер шага, имя инструмента, аргументы
+TOOL_CALLS = (
+    (3, "get_images", {"query": "космос планеты", "count": 3, "safe_for_kids": True}),
+    (4, "wiki_get_material", {"topic": "Солнечная система", "language": "ru", "max_chars": 1000}),
+    (5, "get_quiz", {"topic": "science", "amount": 5, "difficulty": "easy"}),
+)
+
+def pretty(obj) -> str:
+    """JSON с отступами для вывода (orjson не экранирует кириллицу)."""
+    return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
+
+async def call_mcp_tool(client: httpx.AsyncClient, tool_name: str, **kwargs):
     """Вызов MCP инструмента через HTTP API endpoint."""
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        response = await client.post(
-            f"{MCP_SERVER_URL}/api/call-tool",
-            json={
-                "tool_name": tool_name,
-                "arguments": kwargs
-            }
-        )
-        response.raise_for_status()
-        return response.json()
+    response = await client.post(
+        "/api/call-tool",
+        json={
+            "tool_name": tool_name,
+            "arguments": kwargs
+        },
+        timeout=60.0
+    )
+    response.raise_for_status()
+    return orjson.loads(response.content)
 
-async def test_health():
+async def test_health(client: httpx.AsyncClient):
     """Проверка health check."""
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        response = await client.get(f"{MCP_SERVER_URL}/health")
-        response.raise_for_status()
-        return response.json()
+    response = await client.get("/health")
+    response.raise_for_status()
+    return orjson.loads(response.content)
 
-async def test_tools_list():
+async def test_tools_list(client: httpx.AsyncClient):
     """Получение списка инструментов."""
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        response = await client.get(f"{MCP_SERVER_URL}/tools")
-        response.raise_for_status()
-        return response.json()
+    response = await client.get("/tools")
+    response.raise_for_status()
+    return orjson.loads(response.content)
 
 async def main():
+    # Один клиент на все запросы: TCP/TLS соединение с сервером переиспользуется
+    async with httpx.AsyncClient(base_url=MCP_SERVER_URL, timeout=10.0) as client:
+        await run_tests(client)
+
+async def run_tests(client: httpx.AsyncClient):
     print("=" * 60)
     print("Тестирование MCP сервера")
     print("=" * 60)
     
+    # Все запросы независимы — выполняем их параллельно, а выводим
+    # результаты по порядку шагов
+    health, tools, *results = await asyncio.gather(
+        test_health(client),
+        test_tools_list(client),
+        *(call_mcp_tool(client, tool_name, **arguments) for _, tool_name, arguments in TOOL_CALLS),
+        return_exceptions=True
+    )
+    
     # 1. Проверка health check
     print("\n1. Проверка health check...")
-    try:
-        health = await test_health()
-        print(f"✅ Health check: {json.dumps(health, indent=2, ensure_ascii=False)}")
-    except Exception as e:
-        print(f"❌ Ошибка health check: {e}")
+    if isinstance(health, Exception):
+        print(f"❌ Ошибка health check: {health}")
         return
+    print(f"✅ Health check: {pretty(health)}")
     
     # 2. Получение списка инструментов
     print("\n2. Получение списка инструментов...")
-    try:
-        tools = await test_tools_list()
+    if isinstance(tools, Exception):
+        print(f"❌ Ошибка получения списка инструментов: {tools}")
+    else:
         print(f"✅ Найдено инструментов: {tools.get('count', 0)}")
         if tools.get('tools'):
             print("   Доступные инструменты:")
             for tool in tools['tools']:
                 print(f"   - {tool.get('name', 'unknown')}")
-    except Exception as e:
-        print(f"❌ Ошибка получения списка инструментов: {e}")
-    
-    # 3. Тест вызова get_images (не требует API ключей для проверки структуры)
-    print("\n3. Тест вызова get_images...")
-    try:
-        result = await call_mcp_tool(
-            "get_images",
-            query="космос планеты",
-            count=3,
-            safe_for_kids=True
-        )
-        print(f"✅ Результат вызова get_images:")
-        print(json.dumps(result, indent=2, ensure_ascii=False))
-    except Exception as e:
-        print(f"❌ Ошибка вызова get_images: {e}")
-        import traceback
-        traceback.print_exc()
-    
-    # 4. Тест вызова wiki_get_material (не требует API ключей)
-    print("\n4. Тест вызова wiki_get_material...")
-    try:
-        result = await call_mcp_tool(
-            "wiki_get_material",
-            topic="Солнечная система",
-            language="ru",
-            max_chars=1000
-        )
-        print(f"✅ Результат вызова wiki_get_material:")
-        print(json.dumps(result, indent=2, ensure_ascii=False))
-    except Exception as e:
-        print(f"❌ Ошибка вызова wiki_get_material: {e}")
-        import traceback
-        traceback.print_exc()
     
-    # 5. Тест вызова get_quiz (не требует API ключей)
-    print("\n5. Тест вызова get_quiz...")
-    try:
-        result = await call_mcp_tool(
-            "get_quiz",
-            topic="science",
-            amount=5,
-            difficulty="easy"
-        )
-        print(f"✅ Результат вызова get_quiz:")
-        print(json.dumps(result, indent=2, ensure_ascii=False))
-    except Exception as e:
-        print(f"❌ Ошибка вызова get_quiz: {e}")
-        import traceback
-        traceback.print_exc()
+    # 3-5. Вызовы инструментов
+    for (step, tool_name, _), result in zip(TOOL_CALLS, results):
+        print(f"\n{step}. Тест вызова {tool_name}...")
+        if isinstance(result, Exception):
+            print(f"❌ Ошибка вызова {tool_name}: {result}")
+            traceback.print_exception(type(result), result, result.__traceback__)
+            continue
+        print(f"✅ Результат вызова {tool_name}:")
+        print(pretty(result))
     
     print("\n" + "=" * 60)
     print("Тестирование завершено")
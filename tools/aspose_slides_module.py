@@ -6,9 +6,19 @@ https://products.aspose.com/slides/python-net/
 import os
 import uuid
 import io
+import asyncio
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Iterable, Tuple, Union
 from dotenv import load_dotenv
+import aiofiles
+import httpx
+
+from tools.http_client import get_http_client
+from tools.utils import sanitize_filename
 
 # Загружаем переменные окружения
 load_dotenv()
@@ -19,6 +29,51 @@ EXPORTS_DIR = os.getenv("EXPORTS_DIR", "exports")
 # Путь к файлу лицензии Aspose (опционально, без лицензии будет watermark)
 ASPOSE_LICENSE_PATH = os.getenv("ASPOSE_LICENSE_PATH", "")
 
+# In-memory LRU-кэш загруженных изображений (URL -> байты)
+IMAGE_CACHE_SIZE = 128
+_image_cache: "OrderedDict[str, bytes]" = OrderedDict()
+
+# Дисковый кэш изображений, общий для всех процессов (второй уровень после памяти)
+IMAGE_CACHE_DIR = os.getenv(
+    "IMAGE_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "schoolmcp", "images")
+)
+
+# Лимит размера дискового кэша (байты); сверх него удаляются давно не
+# использованные файлы. Проверяется один раз за процесс
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(500 * 1024 * 1024)))
+_image_cache_pruned = False
+
+
+@dataclass(slots=True)
+class Slide:
+    """Данные одного слайда (title, text, image_url)."""
+    title: str = ""
+    text: str = ""
+    image_url: Optional[str] = None
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Slide":
+        """Создание слайда из словаря; лишние ключи игнорируются."""
+        return cls(
+            title=data.get("title") or "",
+            text=data.get("text") or "",
+            image_url=data.get("image_url") or None,
+        )
+
+
+@lru_cache(maxsize=1)
+def _load_aspose() -> Tuple[Any, Any]:
+    """
+    Ленивая загрузка модулей Aspose (aspose.slides, aspose.pydrawing).
+    
+    Импорт тяжёлый (поднимает .NET runtime), поэтому выполняется при первом
+    создании презентации и запоминается. ImportError не кэшируется.
+    """
+    import aspose.slides as slides_module
+    import aspose.pydrawing as drawing_module
+    return slides_module, drawing_module
+
 
 def _apply_license() -> bool:
     """
@@ -32,7 +87,7 @@ def _apply_license() -> bool:
         return False
     
     try:
-        import aspose.slides as slides
+        slides, _ = _load_aspose()
         license = slides.License()
         license.set_license(ASPOSE_LICENSE_PATH)
         return True
@@ -40,6 +95,13 @@ def _apply_license() -> bool:
         return False
 
 
+def _prepare_aspose() -> Tuple[Any, Any]:
+    """Загрузка модулей Aspose и применение лицензии (блокирующие операции)."""
+    modules = _load_aspose()
+    _apply_license()
+    return modules
+
+
 def _ensure_exports_dir() -> str:
     """
     Создание директории для экспорта, если она не существует.
@@ -51,6 +113,14 @@ def _ensure_exports_dir() -> str:
     return EXPORTS_DIR
 
 
+def _safe_title(title: str) -> str:
+    """Очистка заголовка для использования в имени файла."""
+    # Очищаем заголовок от недопустимых символов
+    safe_title = sanitize_filename(title, 50)
+    
+    return safe_title or "presentation"
+
+
 def _generate_filename(title: str) -> str:
     """
     Генерация уникального имени файла для презентации.
@@ -61,40 +131,154 @@ def _generate_filename(title: str) -> str:
     Returns:
         Уникальное имя файла с расширением .pptx
     """
-    # Очищаем заголовок от недопустимых символов
-    safe_title = "".join(c for c in title if c.isalnum() or c in (' ', '-', '_'))
-    safe_title = safe_title.strip()[:50]
-    
-    if not safe_title:
-        safe_title = "presentation"
-    
+    safe_title = _safe_title(title)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     unique_id = uuid.uuid4().hex[:8]
     
     return f"{safe_title}_{timestamp}_{unique_id}.pptx"
 
 
-async def _download_image(url: str) -> Optional[bytes]:
+def _image_cache_path(url: str) -> str:
+    """Путь к файлу изображения в дисковом кэше (по SHA-256 от URL)."""
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    return os.path.join(IMAGE_CACHE_DIR, key)
+
+
+async def _read_cached_image(url: str) -> Optional[bytes]:
+    """Чтение изображения из дискового кэша."""
+    path = _image_cache_path(url)
+    if not os.path.exists(path):
+        return None
+    try:
+        async with aiofiles.open(path, "rb") as f:
+            data = await f.read()
+        # Отмечаем использование: atime часто не обновляется (noatime)
+        os.utime(path)
+        return data
+    except OSError:
+        return None
+
+
+async def _write_cached_image(url: str, data: bytes) -> None:
+    """Атомарная запись изображения в дисковый кэш (через временный файл)."""
+    path = _image_cache_path(url)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        os.makedirs(IMAGE_CACHE_DIR, exist_ok=True)
+        async with aiofiles.open(tmp_path, "wb") as f:
+            await f.write(data)
+        os.replace(tmp_path, path)
+    except OSError:
+        # Кэш необязателен: ошибка записи не должна ломать создание презентации
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _prune_image_cache() -> None:
+    """Удаление давно не использованных файлов дискового кэша сверх лимита."""
+    try:
+        entries = list(os.scandir(IMAGE_CACHE_DIR))
+    except OSError:
+        return
+    
+    files = []
+    total = 0
+    for entry in entries:
+        # Временные файлы принадлежат незавершённым записям
+        if entry.name.endswith(".tmp"):
+            continue
+        try:
+            st = entry.stat()
+        except OSError:
+            continue
+        files.append((max(st.st_atime, st.st_mtime), st.st_size, entry.path))
+        total += st.st_size
+    
+    if total <= IMAGE_CACHE_MAX_BYTES:
+        return
+    
+    files.sort()
+    for _, size, path in files:
+        if total <= IMAGE_CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+
+def _remember_image(url: str, data: bytes) -> None:
+    """Сохранение изображения в in-memory LRU-кэш."""
+    _image_cache[url] = data
+    if len(_image_cache) > IMAGE_CACHE_SIZE:
+        _image_cache.popitem(last=False)
+
+
+async def _download_image(url: str, client: httpx.AsyncClient) -> Optional[bytes]:
     """
-    Загрузка изображения по URL.
+    Загрузка изображения по URL через двухуровневый кэш (память -> диск -> сеть).
     
     Args:
         url: URL изображения.
+        client: HTTP клиент для загрузки.
         
     Returns:
         Байты изображения или None при ошибке.
     """
+    cached = _image_cache.get(url)
+    if cached is not None:
+        _image_cache.move_to_end(url)
+        return cached
+    
+    cached = await _read_cached_image(url)
+    if cached is not None:
+        _remember_image(url, cached)
+        return cached
+    
     try:
-        import httpx
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(url)
-            if response.status_code == 200:
-                return response.content
+        response = await client.get(url)
+        if response.status_code == 200:
+            data = response.content
+            _remember_image(url, data)
+            await _write_cached_image(url, data)
+            return data
     except Exception:
         pass
     return None
 
 
+async def _prefetch_images(urls: Iterable[Optional[str]]) -> Dict[str, Optional[bytes]]:
+    """
+    Параллельная загрузка всех изображений презентации.
+    
+    Args:
+        urls: URL изображений (пустые значения и повторы пропускаются).
+        
+    Returns:
+        Словарь URL -> байты изображения (None, если загрузить не удалось).
+    """
+    global _image_cache_pruned
+    unique_urls = list(dict.fromkeys(url for url in urls if url))
+    if not unique_urls:
+        return {}
+    
+    if not _image_cache_pruned:
+        _image_cache_pruned = True
+        await asyncio.to_thread(_prune_image_cache)
+    
+    client = get_http_client()
+    images = await asyncio.gather(
+        *(_download_image(url, client) for url in unique_urls),
+        return_exceptions=True
+    )
+    # Сбой одной загрузки не должен прерывать остальные: слайд будет без изображения
+    return {
+        url: None if isinstance(image, BaseException) else image
+        for url, image in zip(unique_urls, images)
+    }
+
+
 def _add_title_to_slide(slide, title: str, slides_module, drawing_module) -> None:
     """
     Добавление заголовка на слайд.
@@ -161,7 +345,9 @@ def _add_text_box(
 def _add_image_to_slide(
     pres, 
     slide, 
+    image_url: str,
     image_bytes: bytes, 
+    embedded: Dict[str, Any],
     slides_module
 ) -> bool:
     """
@@ -170,18 +356,20 @@ def _add_image_to_slide(
     Args:
         pres: Объект презентации Aspose.
         slide: Объект слайда Aspose.
+        image_url: URL изображения (ключ для повторного использования).
         image_bytes: Байты изображения.
+        embedded: Уже добавленные в презентацию изображения (URL -> объект Aspose).
         slides_module: Модуль aspose.slides.
         
     Returns:
         True если изображение добавлено успешно.
     """
     try:
-        # Создаем поток из байтов
-        image_stream = io.BytesIO(image_bytes)
-        
-        # Добавляем изображение в коллекцию презентации
-        image = pres.images.add_image(image_stream)
+        # Одно и то же изображение на нескольких слайдах хранится в PPTX один раз
+        image = embedded.get(image_url)
+        if image is None:
+            image = pres.images.add_image(io.BytesIO(image_bytes))
+            embedded[image_url] = image
         
         # Добавляем рамку с изображением на слайд
         # Позиционируем справа от текста
@@ -196,9 +384,92 @@ def _add_image_to_slide(
         return False
 
 
+def _build_pptx_sync(
+    slides: List[Slide],
+    images: Dict[str, Optional[bytes]],
+    slides_module: Any,
+    drawing_module: Any
+) -> bytes:
+    """
+    Сборка PPTX средствами Aspose Slides (блокирующая, выполняется в потоке).
+    
+    Args:
+        slides: Слайды презентации.
+        images: Заранее загруженные изображения (URL -> байты).
+        slides_module: Модуль aspose.slides.
+        drawing_module: Модуль aspose.pydrawing.
+        
+    Returns:
+        Содержимое файла PPTX.
+    """
+    # Создаем новую презентацию
+    with slides_module.Presentation() as pres:
+        # Удаляем пустой слайд по умолчанию
+        if len(pres.slides) > 0:
+            pres.slides.remove_at(0)
+        
+        # Ищем пустой layout (BLANK) без плейсхолдеров
+        blank_layout = None
+        for layout in pres.layout_slides:
+            if layout.layout_type == slides_module.SlideLayoutType.BLANK:
+                blank_layout = layout
+                break
+        
+        # Если BLANK layout не найден, используем первый и будем удалять shapes
+        if blank_layout is None:
+            blank_layout = pres.layout_slides[0]
+        
+        # Изображения, уже добавленные в презентацию (URL -> объект Aspose)
+        embedded: Dict[str, Any] = {}
+        
+        # Создаем слайды
+        for slide_data in slides:
+            # Добавляем новый слайд
+            slide = pres.slides.add_empty_slide(blank_layout)
+            
+            # Удаляем все дефолтные shapes (плейсхолдеры) со слайда.
+            # Удаляем по индексу с конца: индексы оставшихся не сдвигаются,
+            # и не нужен поиск shape в коллекции, как у remove(shape)
+            shapes = slide.shapes
+            for i in reversed(range(len(shapes))):
+                if shapes[i].placeholder is not None:
+                    shapes.remove_at(i)
+            
+            slide_title = slide_data.title
+            slide_text = slide_data.text
+            image_url = slide_data.image_url
+            
+            has_image = False
+            
+            # Добавляем изображение, если оно указано и загрузилось
+            if image_url:
+                image_bytes = images.get(image_url)
+                if image_bytes:
+                    has_image = _add_image_to_slide(
+                        pres, slide, image_url, image_bytes, embedded, slides_module
+                    )
+            
+            # Добавляем заголовок
+            if slide_title:
+                _add_title_to_slide(slide, slide_title, slides_module, drawing_module)
+            
+            # Добавляем текст (позиция зависит от наличия изображения)
+            if slide_text:
+                # Если есть изображение, текст левее и уже
+                if has_image:
+                    _add_text_box(slide, slide_text, 50, 100, 330, 300, slides_module)
+                else:
+                    _add_text_box(slide, slide_text, 50, 100, 620, 350, slides_module)
+        
+        # Сохраняем в память: файл записывается асинхронно в build_presentation
+        buffer = io.BytesIO()
+        pres.save(buffer, slides_module.export.SaveFormat.PPTX)
+        return buffer.getvalue()
+
+
 async def build_presentation(
     title: str,
-    slides_data: List[Dict[str, str]]
+    slides_data: Iterable[Union[Dict[str, str], Slide]]
 ) -> Dict[str, Any]:
     """
     Создает презентацию PowerPoint с помощью Aspose Slides.
@@ -209,7 +480,7 @@ async def build_presentation(
     
     Args:
         title: Заголовок презентации.
-        slides_data: Список слайдов. Каждый слайд — словарь с ключами:
+        slides_data: Список слайдов. Каждый слайд — Slide или словарь с ключами:
             - title: str — заголовок слайда
             - text: str — основной текст слайда
             - image_url: str (опционально) — URL изображения для слайда
@@ -228,101 +499,58 @@ async def build_presentation(
             "error": str           # Описание ошибки
         }
     """
-    # Импортируем Aspose модули
+    # Публичный API принимает словари — приводим их к Slide один раз на входе;
+    # готовые объекты Slide используются как есть
+    slides = [
+        slide_data if isinstance(slide_data, Slide) else Slide.from_dict(slide_data)
+        for slide_data in slides_data
+    ]
+    
+    # Загружаем все изображения заранее и параллельно, а не по одному в цикле слайдов.
+    # Загрузка идёт, пока в потоке импортируется Aspose и применяется лицензия
+    prefetch = asyncio.create_task(
+        _prefetch_images([s.image_url for s in slides if s.image_url])
+    )
+    
+    # Импортируем Aspose модули и применяем лицензию (если есть)
     try:
-        import aspose.slides as slides_module
-        import aspose.pydrawing as drawing_module
-    except ImportError as e:
+        slides_module, drawing_module = await asyncio.to_thread(_prepare_aspose)
+    except ImportError:
+        prefetch.cancel()
         return {
             "error": "Aspose Slides не установлен. "
                      "Выполните: pip install aspose.slides"
         }
     
-    # Применяем лицензию (если есть)
-    _apply_license()
-    
     # Создаем директорию для экспорта
     try:
         _ensure_exports_dir()
     except OSError as e:
+        prefetch.cancel()
         return {"error": f"Не удалось создать директорию для экспорта: {str(e)}"}
     
+    images = await prefetch
+    
     try:
-        # Создаем новую презентацию
-        with slides_module.Presentation() as pres:
-            # Удаляем пустой слайд по умолчанию
-            if len(pres.slides) > 0:
-                pres.slides.remove_at(0)
-            
-            # Ищем пустой layout (BLANK) без плейсхолдеров
-            blank_layout = None
-            for layout in pres.layout_slides:
-                if layout.layout_type == slides_module.SlideLayoutType.BLANK:
-                    blank_layout = layout
-                    break
-            
-            # Если BLANK layout не найден, используем первый и будем удалять shapes
-            if blank_layout is None:
-                blank_layout = pres.layout_slides[0]
-            
-            # Создаем слайды
-            for slide_data in slides_data:
-                # Добавляем новый слайд
-                slide = pres.slides.add_empty_slide(blank_layout)
-                
-                # Удаляем все дефолтные shapes (плейсхолдеры) со слайда
-                # Перебираем в обратном порядке, чтобы удаление не сбивало индексы
-                shapes_to_remove = []
-                for i in range(len(slide.shapes)):
-                    shape = slide.shapes[i]
-                    # Удаляем все плейсхолдеры
-                    if shape.placeholder is not None:
-                        shapes_to_remove.append(shape)
-                
-                for shape in shapes_to_remove:
-                    slide.shapes.remove(shape)
-                
-                slide_title = slide_data.get("title", "")
-                slide_text = slide_data.get("text", "")
-                image_url = slide_data.get("image_url")
-                
-                has_image = False
-                
-                # Загружаем изображение, если указано
-                if image_url:
-                    image_bytes = await _download_image(image_url)
-                    if image_bytes:
-                        has_image = _add_image_to_slide(
-                            pres, slide, image_bytes, slides_module
-                        )
-                
-                # Добавляем заголовок
-                if slide_title:
-                    _add_title_to_slide(slide, slide_title, slides_module, drawing_module)
-                
-                # Добавляем текст (позиция зависит от наличия изображения)
-                if slide_text:
-                    # Если есть изображение, текст левее и уже
-                    if has_image:
-                        _add_text_box(slide, slide_text, 50, 100, 330, 300, slides_module)
-                    else:
-                        _add_text_box(slide, slide_text, 50, 100, 620, 350, slides_module)
-            
-            # Генерируем имя файла и сохраняем
-            filename = _generate_filename(title)
-            file_path = os.path.join(EXPORTS_DIR, filename)
-            
-            pres.save(file_path, slides_module.export.SaveFormat.PPTX)
-            
-            # Получаем размер файла
-            file_size = os.path.getsize(file_path)
-            
-            return {
-                "file_path": file_path,
-                "file_name": filename,
-                "slides_count": len(slides_data),
-                "file_size": file_size
-            }
+        # Aspose работает синхронно — собираем презентацию в отдельном потоке,
+        # чтобы не блокировать event loop
+        data = await asyncio.to_thread(
+            _build_pptx_sync, slides, images, slides_module, drawing_module
+        )
+        
+        # Генерируем имя файла и записываем одним вызовом
+        filename = _generate_filename(title)
+        file_path = os.path.join(EXPORTS_DIR, filename)
+        
+        async with aiofiles.open(file_path, "wb") as f:
+            await f.write(data)
+        
+        return {
+            "file_path": file_path,
+            "file_name": filename,
+            "slides_count": len(slides),
+            "file_size": len(data)
+        }
             
     except Exception as e:
         return {
@@ -2,17 +2,78 @@
 Инструмент для создания презентаций через Aspose Slides.
 Локальная библиотека для создания PowerPoint без внешних API.
 """
-from typing import Dict, List
-from pydantic import Field
+import asyncio
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field, field_validator
 
 from mcp_instance import mcp
 from tools.aspose_slides_module import build_presentation
 
+# Допустимые схемы image_url (кортеж собирается один раз, а не на каждый слайд)
+_URL_PREFIXES = ("http://", "https://")
+
+# Выполняющиеся сборки презентаций: ключ запроса -> задача сборки.
+# Одинаковые параллельные запросы ждут одну сборку вместо повторного рендера.
+_INFLIGHT: Dict[str, asyncio.Task] = {}
+
+
+class SlideInput(BaseModel):
+    """Слайд во входных данных create_presentation (разбирается pydantic)."""
+    title: str = Field("", description="Заголовок слайда")
+    text: str = Field("", description="Основной текст слайда")
+    image_url: Optional[str] = Field(None, description="URL изображения (http:// или https://)")
+
+    @field_validator("title", "text", mode="before")
+    @classmethod
+    def _coerce_text(cls, value: Any) -> str:
+        """Пустые значения -> "", остальные (например, числа) приводятся к строке."""
+        return str(value) if value else ""
+
+    @field_validator("image_url", mode="before")
+    @classmethod
+    def _coerce_image_url(cls, value: Any) -> Optional[str]:
+        """Пустые значения -> None, остальные приводятся к строке."""
+        return str(value) if value else None
+
+
+def _request_key(title: str, slides: List[Dict]) -> str:
+    """Ключ запроса на сборку презентации (хэш от заголовка и слайдов)."""
+    payload = json.dumps({"title": title, "slides": slides}, sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _forget_inflight(key: str, task: asyncio.Task) -> None:
+    """Удаление завершённой сборки из _INFLIGHT."""
+    del _INFLIGHT[key]
+    # Помечаем исключение полученным, даже если все ожидающие были отменены
+    if not task.cancelled():
+        task.exception()
+
+
+async def _build_coalesced(title: str, slides: List[Dict]) -> Dict[str, Any]:
+    """
+    Сборка презентации с объединением одинаковых параллельных запросов.
+    
+    Сборка выполняется отдельной задачей, которую ожидают все вызовы
+    с тем же ключом, включая первый.
+    """
+    key = _request_key(title, slides)
+    task = _INFLIGHT.get(key)
+    if task is None:
+        task = asyncio.create_task(build_presentation(title=title, slides_data=slides))
+        _INFLIGHT[key] = task
+        task.add_done_callback(lambda done: _forget_inflight(key, done))
+    # shield: отмена любого из ожидающих (в том числе первого)
+    # не должна отменять общую сборку
+    return await asyncio.shield(task)
+
 
 @mcp.tool()
 async def create_presentation(
     title: str = Field(..., description="Заголовок презентации"),
-    slides: List[Dict] = Field(
+    slides: List[SlideInput] = Field(
         ..., 
         description="Список слайдов: [{title: str, text: str, image_url?: str}, ...]"
     )
@@ -77,43 +138,26 @@ async def create_presentation(
     if not slides:
         return {"error": "Список слайдов (slides) не может быть пустым."}
     
-    if not isinstance(slides, list):
-        return {"error": "Параметр slides должен быть списком словарей."}
-    
-    # Валидация каждого слайда
+    # Типы (список, словари, строки) уже проверены pydantic при разборе
+    # аргументов — здесь остаются только бизнес-правила
     validated_slides: List[Dict] = []
-    for i, slide in enumerate(slides):
-        if not isinstance(slide, dict):
-            return {"error": f"Слайд #{i+1} должен быть словарём с ключами title, text, image_url."}
-        
-        slide_title = slide.get("title", "")
-        slide_text = slide.get("text", "")
-        image_url = slide.get("image_url")
-        
+    for i, slide in enumerate(slides, 1):
         # Хотя бы title или text должен быть заполнен
-        if not slide_title and not slide_text:
-            return {"error": f"Слайд #{i+1}: укажите хотя бы title или text."}
+        if not slide.title and not slide.text:
+            return {"error": f"Слайд #{i}: укажите хотя бы title или text."}
         
-        validated_slide = {
-            "title": str(slide_title) if slide_title else "",
-            "text": str(slide_text) if slide_text else ""
-        }
+        validated_slide = {"title": slide.title, "text": slide.text}
         
-        if image_url:
+        if slide.image_url:
             # Базовая проверка URL
-            image_url_str = str(image_url).strip()
-            if not image_url_str.startswith(("http://", "https://")):
+            image_url = slide.image_url.strip()
+            if not image_url.startswith(_URL_PREFIXES):
                 return {
-                    "error": f"Слайд #{i+1}: image_url должен начинаться с http:// или https://"
+                    "error": f"Слайд #{i}: image_url должен начинаться с http:// или https://"
                 }
-            validated_slide["image_url"] = image_url_str
+            validated_slide["image_url"] = image_url
         
         validated_slides.append(validated_slide)
     
     # Создаем презентацию через Aspose Slides
-    result = await build_presentation(
-        title=title.strip(),
-        slides_data=validated_slides
-    )
-    
-    return result
+    return await _build_coalesced(title.strip(), validated_slides)
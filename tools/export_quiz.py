@@ -2,21 +2,30 @@
 Инструмент для экспорта викторин в различные форматы (JSON, HTML, CSV).
 """
 import os
-import json
+import io
+import asyncio
 import csv
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from pathlib import Path
 import aiofiles
+import orjson
 from pydantic import Field
 from jinja2 import Template
 
 from mcp_instance import mcp
+from tools.utils import sanitize_filename
 
 # Создаем папку exports, если её нет
 EXPORTS_DIR = Path("exports")
 EXPORTS_DIR.mkdir(exist_ok=True)
 
+# Абсолютный путь вычисляется один раз, а не для каждого файла
+_EXPORTS_DIR_ABS = EXPORTS_DIR.absolute()
+
+# Поддерживаемые форматы экспорта
+_EXPORT_FORMATS = ("json", "html", "csv")
+
 
 def load_html_template() -> str:
     """Загружает HTML шаблон из файла."""
@@ -27,6 +36,28 @@ def load_html_template() -> str:
     return ""
 
 
+# Скомпилированный шаблон викторины (заполняется при первой успешной загрузке)
+_quiz_template: Optional[Template] = None
+
+
+def _get_quiz_template() -> Optional[Template]:
+    """
+    Скомпилированный Jinja2 шаблон викторины.
+    
+    Файл читается и компилируется один раз за процесс, а не на каждый экспорт.
+    Отсутствие файла не запоминается: шаблон, добавленный позже, будет подхвачен.
+    
+    Returns:
+        Шаблон или None, если файл шаблона не найден.
+    """
+    global _quiz_template
+    if _quiz_template is None:
+        template_content = load_html_template()
+        if template_content:
+            _quiz_template = Template(template_content)
+    return _quiz_template
+
+
 @mcp.tool()
 async def export_quiz(
     quiz_data: Dict = Field(..., description="Данные викторины для экспорта"),
@@ -50,13 +81,66 @@ async def export_quiz(
             "error": "Данные викторины некорректны или отсутствуют"
         }
     
-    # Генерируем имя файла, если не указано
-    if not filename:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        topic_safe = "".join(c for c in quiz_data.get("topic", "quiz") if c.isalnum() or c in (" ", "-", "_")).strip()[:30]
-        topic_safe = topic_safe.replace(" ", "_")
-        filename = f"quiz_{topic_safe}_{timestamp}"
+    return await _export(quiz_data, format, filename or _default_filename(quiz_data))
+
+
+@mcp.tool()
+async def batch_export_quiz(
+    quiz_data: Dict = Field(..., description="Данные викторины для экспорта"),
+    formats: List[str] = Field(["json", "html", "csv"], description="Список форматов экспорта: json, html, csv"),
+    filename: Optional[str] = Field(None, description="Имя файлов (без расширения). Если не указано, будет сгенерировано автоматически")
+) -> Dict:
+    """
+    Экспорт викторины сразу в несколько форматов за один вызов.
+    
+    Args:
+        quiz_data: Словарь с данными викторины (результат get_quiz)
+        formats: Список форматов экспорта (json, html, csv)
+        filename: Общее имя файлов без расширения (опционально)
+    
+    Returns:
+        Словарь с общим флагом success и результатами export_quiz
+        по каждому формату в поле exports
+    """
+    if not quiz_data.get("success"):
+        return {
+            "success": False,
+            "error": "Данные викторины некорректны или отсутствуют"
+        }
+    
+    filename = filename or _default_filename(quiz_data)
+    # Порядок без повторов: один файл на формат
+    formats = list(dict.fromkeys(fmt.lower() for fmt in formats))
+    if not formats:
+        return {
+            "success": False,
+            "error": "Не указаны форматы экспорта. Используйте: json, html, csv"
+        }
+    for fmt in formats:
+        if fmt not in _EXPORT_FORMATS:
+            return {
+                "success": False,
+                "error": f"Неподдерживаемый формат: {fmt}. Используйте: json, html, csv"
+            }
+    
+    results = await asyncio.gather(*(_export(quiz_data, fmt, filename) for fmt in formats))
     
+    return {
+        "success": all(result.get("success") for result in results),
+        "exports": dict(zip(formats, results))
+    }
+
+
+def _default_filename(quiz_data: Dict) -> str:
+    """Генерация имени файла по теме викторины и текущему времени."""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    topic_safe = sanitize_filename(quiz_data.get("topic", "quiz"), 30)
+    topic_safe = topic_safe.replace(" ", "_")
+    return f"quiz_{topic_safe}_{timestamp}"
+
+
+async def _export(quiz_data: Dict, format: str, filename: str) -> Dict:
+    """Экспорт в один формат по его названию."""
     format = format.lower()
     
     if format == "json":
@@ -74,18 +158,19 @@ async def export_quiz(
 
 async def _export_json(quiz_data: Dict, filename: str) -> Dict:
     """Экспорт в JSON формат."""
-    filepath = EXPORTS_DIR / f"{filename}.json"
+    filepath = _EXPORTS_DIR_ABS / f"{filename}.json"
     
     try:
-        async with aiofiles.open(filepath, "w", encoding="utf-8") as f:
-            await f.write(json.dumps(quiz_data, ensure_ascii=False, indent=2))
+        data = orjson.dumps(quiz_data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        async with aiofiles.open(filepath, "wb") as f:
+            await f.write(data)
         
         return {
             "success": True,
             "format": "json",
             "filename": filepath.name,
-            "filepath": str(filepath.absolute()),
-            "size": filepath.stat().st_size
+            "filepath": str(filepath),
+            "size": len(data)
         }
     except Exception as e:
         return {
@@ -96,18 +181,16 @@ async def _export_json(quiz_data: Dict, filename: str) -> Dict:
 
 async def _export_html(quiz_data: Dict, filename: str) -> Dict:
     """Экспорт в HTML формат с использованием Jinja2 шаблона."""
-    filepath = EXPORTS_DIR / f"{filename}.html"
+    filepath = _EXPORTS_DIR_ABS / f"{filename}.html"
     
     try:
-        template_content = load_html_template()
-        if not template_content:
+        template = _get_quiz_template()
+        if template is None:
             return {
                 "success": False,
                 "error": "HTML шаблон не найден в templates/quiz_template.html"
             }
         
-        template = Template(template_content)
-        
         # Подготавливаем данные для шаблона
         template_data = {
             "topic": quiz_data.get("topic", "Неизвестная тема"),
@@ -116,17 +199,17 @@ async def _export_html(quiz_data: Dict, filename: str) -> Dict:
             "questions": quiz_data.get("questions", [])
         }
         
-        html_content = template.render(**template_data)
+        data = template.render(**template_data).encode("utf-8")
         
-        async with aiofiles.open(filepath, "w", encoding="utf-8") as f:
-            await f.write(html_content)
+        async with aiofiles.open(filepath, "wb") as f:
+            await f.write(data)
         
         return {
             "success": True,
             "format": "html",
             "filename": filepath.name,
-            "filepath": str(filepath.absolute()),
-            "size": filepath.stat().st_size
+            "filepath": str(filepath),
+            "size": len(data)
         }
     except Exception as e:
         return {
@@ -137,45 +220,51 @@ async def _export_html(quiz_data: Dict, filename: str) -> Dict:
 
 async def _export_csv(quiz_data: Dict, filename: str) -> Dict:
     """Экспорт в CSV формат с поддержкой кириллицы для Excel."""
-    filepath = EXPORTS_DIR / f"{filename}.csv"
+    filepath = _EXPORTS_DIR_ABS / f"{filename}.csv"
     
     try:
         questions = quiz_data.get("questions", [])
         
-        # Используем синхронную запись для CSV с BOM
-        with open(filepath, "w", encoding="utf-8-sig", newline="") as f:
-            writer = csv.writer(f, delimiter=",", quoting=csv.QUOTE_MINIMAL)
-            
-            # Заголовки
+        # Собираем CSV в памяти и записываем одним асинхронным вызовом,
+        # чтобы не блокировать event loop синхронным open()
+        buffer = io.StringIO(newline="")
+        writer = csv.writer(buffer, delimiter=",", quoting=csv.QUOTE_MINIMAL)
+        
+        # Заголовки
+        writer.writerow([
+            "Номер",
+            "Вопрос",
+            "Правильный ответ",
+            "Неправильные ответы",
+            "Сложность",
+            "Тип",
+            "Категория"
+        ])
+        
+        # Данные
+        for idx, question in enumerate(questions, 1):
+            incorrect_answers = " | ".join(question.get("incorrect_answers", []))
             writer.writerow([
-                "Номер",
-                "Вопрос",
-                "Правильный ответ",
-                "Неправильные ответы",
-                "Сложность",
-                "Тип",
-                "Категория"
+                idx,
+                question.get("question", ""),
+                question.get("correct_answer", ""),
+                incorrect_answers,
+                question.get("difficulty", ""),
+                question.get("type", ""),
+                question.get("category", "")
             ])
-            
-            # Данные
-            for idx, question in enumerate(questions, 1):
-                incorrect_answers = " | ".join(question.get("incorrect_answers", []))
-                writer.writerow([
-                    idx,
-                    question.get("question", ""),
-                    question.get("correct_answer", ""),
-                    incorrect_answers,
-                    question.get("difficulty", ""),
-                    question.get("type", ""),
-                    question.get("category", "")
-                ])
+        
+        # BOM (utf-8-sig) для корректной кириллицы в Excel
+        data = buffer.getvalue().encode("utf-8-sig")
+        async with aiofiles.open(filepath, "wb") as f:
+            await f.write(data)
         
         return {
             "success": True,
             "format": "csv",
             "filename": filepath.name,
-            "filepath": str(filepath.absolute()),
-            "size": filepath.stat().st_size,
+            "filepath": str(filepath),
+            "size": len(data),
             "note": "Файл сохранен с BOM для корректного отображения кириллицы в Excel"
         }
     except Exception as e:
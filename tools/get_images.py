@@ -3,12 +3,19 @@
 Поддерживает безопасный поиск для детей и различные стили изображений.
 """
 import os
+import time
+import uuid
+import hashlib
+from collections import OrderedDict
 from typing import Dict, List, Optional
 from dotenv import load_dotenv
+import aiofiles
 import httpx
+import orjson
 from pydantic import Field
 
 from mcp_instance import mcp
+from tools.http_client import get_http_client
 
 # Загружаем переменные окружения
 load_dotenv()
@@ -16,6 +23,75 @@ load_dotenv()
 UNSPLASH_ACCESS_KEY = os.getenv("UNSPLASH_ACCESS_KEY")
 UNSPLASH_API_URL = "https://api.unsplash.com/search/photos"
 
+# Заголовок авторизации не меняется между вызовами
+_UNSPLASH_HEADERS = {"Authorization": f"Client-ID {UNSPLASH_ACCESS_KEY}"}
+
+# Кэш результатов поиска: лимит Unsplash (50 запросов/час на dev-ключе)
+# не тратится на повторные запросы. Первый уровень — память (LRU),
+# второй — диск с TTL, общий для процессов и перезапусков
+UNSPLASH_CACHE_SIZE = 512
+UNSPLASH_CACHE_TTL = float(os.getenv("UNSPLASH_CACHE_TTL", str(7 * 24 * 3600)))
+UNSPLASH_CACHE_DIR = os.getenv(
+    "UNSPLASH_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "schoolmcp", "unsplash")
+)
+
+# Ключ -> (время записи, результат)
+_search_cache: "OrderedDict[str, tuple]" = OrderedDict()
+
+
+def _search_cache_key(query: str, count: int, safe_for_kids: bool, style_hint: Optional[str]) -> str:
+    """Ключ кэша по параметрам поиска (SHA-1)."""
+    raw = f"{query}|{count}|{safe_for_kids}|{style_hint}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+async def _read_cached_search(key: str) -> Optional[Dict]:
+    """Поиск результата в памяти, затем на диске (с проверкой TTL по mtime)."""
+    entry = _search_cache.get(key)
+    if entry is not None:
+        stored_at, result = entry
+        if time.time() - stored_at < UNSPLASH_CACHE_TTL:
+            _search_cache.move_to_end(key)
+            return result
+        del _search_cache[key]
+    
+    path = os.path.join(UNSPLASH_CACHE_DIR, f"{key}.json")
+    try:
+        stored_at = os.path.getmtime(path)
+        if time.time() - stored_at >= UNSPLASH_CACHE_TTL:
+            return None
+        async with aiofiles.open(path, "rb") as f:
+            result = orjson.loads(await f.read())
+    except (OSError, orjson.JSONDecodeError):
+        return None
+    _remember_search(key, result, stored_at)
+    return result
+
+
+def _remember_search(key: str, result: Dict, stored_at: float) -> None:
+    """Сохранение результата в in-memory LRU-кэш."""
+    _search_cache[key] = (stored_at, result)
+    _search_cache.move_to_end(key)
+    if len(_search_cache) > UNSPLASH_CACHE_SIZE:
+        _search_cache.popitem(last=False)
+
+
+async def _write_cached_search(key: str, result: Dict) -> None:
+    """Сохранение результата в память и атомарно на диск (через временный файл)."""
+    _remember_search(key, result, time.time())
+    path = os.path.join(UNSPLASH_CACHE_DIR, f"{key}.json")
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        os.makedirs(UNSPLASH_CACHE_DIR, exist_ok=True)
+        async with aiofiles.open(tmp_path, "wb") as f:
+            await f.write(orjson.dumps(result))
+        os.replace(tmp_path, path)
+    except OSError:
+        # Кэш необязателен: ошибка записи не должна ломать поиск
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
 
 @mcp.tool()
 async def get_images(
@@ -68,6 +144,11 @@ async def get_images(
             "items": []
         }
     
+    cache_key = _search_cache_key(query, count, safe_for_kids, style_hint)
+    cached = await _read_cached_search(cache_key)
+    if cached is not None:
+        return cached
+    
     # Формируем поисковый запрос с учетом стиля
     search_query = query
     if style_hint:
@@ -84,64 +165,62 @@ async def get_images(
         "content_filter": "high" if safe_for_kids else "low"  # high = более строгий фильтр
     }
     
-    headers = {
-        "Authorization": f"Client-ID {UNSPLASH_ACCESS_KEY}"
-    }
-    
     try:
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            resp = await client.get(UNSPLASH_API_URL, params=params, headers=headers)
-            
-            if resp.status_code == 401:
-                return {
-                    "error": "Неверный UNSPLASH_ACCESS_KEY. Проверьте ключ API.",
-                    "items": []
-                }
-            
-            if resp.status_code == 403:
-                return {
-                    "error": "Превышен лимит запросов Unsplash API.",
-                    "items": []
-                }
-            
-            if resp.status_code != 200:
-                return {
-                    "error": f"Ошибка Unsplash API: HTTP {resp.status_code}",
-                    "items": []
-                }
-            
-            data = resp.json()
-            total_found = data.get("total", 0)
-            
-            items: List[Dict] = []
-            for photo in data.get("results", [])[:count]:
-                photo_id = photo.get("id", "")
-                author_name = photo.get("user", {}).get("name", "Unknown")
-                author_username = photo.get("user", {}).get("username", "")
-                
-                # Формируем строку атрибуции согласно требованиям Unsplash
-                attribution = f"Photo by {author_name} on Unsplash"
-                if author_username:
-                    attribution = f"Photo by {author_name} (@{author_username}) on Unsplash"
-                
-                items.append({
-                    "url": photo.get("urls", {}).get("regular", ""),
-                    "thumb_url": photo.get("urls", {}).get("thumb", ""),
-                    "author": author_name,
-                    "source": "unsplash",
-                    "attribution": attribution,
-                    # Дополнительные поля для совместимости
-                    "id": photo_id,
-                    "description": photo.get("description") or photo.get("alt_description", ""),
-                    "download_url": photo.get("links", {}).get("download", ""),
-                })
-            
+        client = get_http_client()
+        resp = await client.get(UNSPLASH_API_URL, params=params, headers=_UNSPLASH_HEADERS, timeout=15.0)
+
+        if resp.status_code == 401:
+            return {
+                "error": "Неверный UNSPLASH_ACCESS_KEY. Проверьте ключ API.",
+                "items": []
+            }
+
+        if resp.status_code == 403:
+            return {
+                "error": "Превышен лимит запросов Unsplash API.",
+                "items": []
+            }
+
+        if resp.status_code != 200:
             return {
-                "items": items,
-                "query": query,
-                "total_found": total_found
+                "error": f"Ошибка Unsplash API: HTTP {resp.status_code}",
+                "items": []
             }
-            
+
+        data = resp.json()
+        total_found = data.get("total", 0)
+
+        items: List[Dict] = []
+        for photo in data.get("results", [])[:count]:
+            photo_id = photo.get("id", "")
+            author_name = photo.get("user", {}).get("name", "Unknown")
+            author_username = photo.get("user", {}).get("username", "")
+
+            # Формируем строку атрибуции согласно требованиям Unsplash
+            attribution = f"Photo by {author_name} on Unsplash"
+            if author_username:
+                attribution = f"Photo by {author_name} (@{author_username}) on Unsplash"
+
+            items.append({
+                "url": photo.get("urls", {}).get("regular", ""),
+                "thumb_url": photo.get("urls", {}).get("thumb", ""),
+                "author": author_name,
+                "source": "unsplash",
+                "attribution": attribution,
+                # Дополнительные поля для совместимости
+                "id": photo_id,
+                "description": photo.get("description") or photo.get("alt_description", ""),
+                "download_url": photo.get("links", {}).get("download", ""),
+            })
+
+        result = {
+            "items": items,
+            "query": query,
+            "total_found": total_found
+        }
+        await _write_cached_search(cache_key, result)
+        return result
+
     except httpx.TimeoutException:
         return {
             "error": "Превышено время ожидания ответа от Unsplash API.",
@@ -58,55 +58,40 @@ async def get_quiz(
             "category_id": category_id
         }
     
-    # Шаг 3: Собрать все тексты для перевода в один плоский список
+    # Шаг 3: Собрать все тексты для перевода в один плоский список.
+    # offsets[i]:offsets[i + 1] — тексты i-го вопроса: вопрос, правильный
+    # ответ, затем неправильные ответы
     text_pool = []
-    text_indices = []  # Для отслеживания, к какому вопросу относится каждый текст
+    offsets = [0]
     
-    for q_idx, question in enumerate(questions):
-        # Вопрос
+    for question in questions:
         text_pool.append(question["question"])
-        text_indices.append(("question", q_idx))
-        
-        # Правильный ответ
         text_pool.append(question["correct_answer"])
-        text_indices.append(("correct_answer", q_idx))
-        
-        # Неправильные ответы
-        for ans_idx in range(len(question["incorrect_answers"])):
-            text_pool.append(question["incorrect_answers"][ans_idx])
-            text_indices.append(("incorrect_answer", q_idx, ans_idx))
+        text_pool.extend(question["incorrect_answers"])
+        offsets.append(len(text_pool))
     
     # Шаг 4: Пакетный перевод всех текстов
     translated_texts = await translate_batch(text_pool, target="ru")
     
+    # Если переводов пришло меньше, недостающие тексты остаются без перевода
+    if len(translated_texts) < len(text_pool):
+        translated_texts = translated_texts + text_pool[len(translated_texts):]
+    
     # Шаг 5: Разобрать переведенные тексты обратно в структуру вопросов
     translated_questions = []
-    text_idx = 0
     
-    for question in questions:
+    for i, question in enumerate(questions):
+        chunk = translated_texts[offsets[i]:offsets[i + 1]]
         translated_q = {
             "category": question["category"],
             "type": question["type"],
             "difficulty": question["difficulty"],
-            "question": translated_texts[text_idx] if text_idx < len(translated_texts) else question["question"],
-            "correct_answer": translated_texts[text_idx + 1] if text_idx + 1 < len(translated_texts) else question["correct_answer"],
-            "incorrect_answers": []
+            "question": chunk[0],
+            "correct_answer": chunk[1],
+            "incorrect_answers": chunk[2:],
+            # Все варианты ответов для удобства
+            "all_answers": chunk[1:]
         }
-        text_idx += 2
-        
-        # Неправильные ответы
-        num_incorrect = len(question["incorrect_answers"])
-        for i in range(num_incorrect):
-            if text_idx < len(translated_texts):
-                translated_q["incorrect_answers"].append(translated_texts[text_idx])
-            else:
-                translated_q["incorrect_answers"].append(question["incorrect_answers"][i])
-            text_idx += 1
-        
-        # Формируем все варианты ответов для удобства
-        all_answers = [translated_q["correct_answer"]] + translated_q["incorrect_answers"]
-        translated_q["all_answers"] = all_answers
-        
         translated_questions.append(translated_q)
     
     return {
@@ -0,0 +1,52 @@
+"""
+Общий HTTP клиент (httpx) для инструментов.
+Один пул соединений на процесс: повторные запросы к тем же хостам
+переиспользуют TCP/TLS соединения вместо нового handshake на каждый вызов.
+"""
+import asyncio
+import importlib.util
+from typing import Optional
+import httpx
+
+# HTTP/2 (мультиплексирование запросов к одному хосту) — если установлен h2
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Клиент и event loop, в котором он создан
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Получение общего HTTP клиента.
+
+    Клиент создаётся лениво при первом вызове. Соединения httpx привязаны
+    к event loop, поэтому при запуске в новом loop (например, несколько
+    asyncio.run() в тестах) создаётся новый клиент.
+
+    Returns:
+        Экземпляр httpx.AsyncClient с пулом соединений.
+    """
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = httpx.AsyncClient(
+            timeout=30.0,
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=50,
+                max_keepalive_connections=50,
+                keepalive_expiry=60.0
+            )
+        )
+        _client_loop = loop
+    return _client
+
+
+async def close_http_client() -> None:
+    """Закрытие общего HTTP клиента (при остановке приложения)."""
+    global _client, _client_loop
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+    _client_loop = None
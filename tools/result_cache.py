@@ -0,0 +1,99 @@
+"""
+Кэш результатов идемпотентных вызовов инструментов для /api/call-tool.
+Повторный вызов с теми же аргументами в пределах TTL возвращается из памяти
+без повторного обращения к внешним API.
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import orjson
+
+from mcp_instance import mcp
+
+# Время жизни записи (секунды) и максимальное число записей (LRU)
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "300"))
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "256"))
+
+# Не кэшируются: инструменты с побочными эффектами, с недетерминированным
+# результатом (get_quiz выбирает случайные вопросы, get_cache_stats отдаёт
+# текущие счётчики) и со своим собственным кэшем (wiki_get_material, get_images)
+_NON_CACHEABLE = {
+    "get_quiz",
+    "get_cache_stats",
+    "wiki_get_material",
+    "get_images",
+    "schedule_lesson",
+    "create_presentation",
+    "export_quiz",
+    "batch_export_quiz",
+}
+
+# Ключ -> (время записи, результат)
+_RESULT_CACHE: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+_STATS = {"hits": 0, "misses": 0}
+
+
+def make_key(tool_name: str, arguments: Dict[str, Any]) -> Optional[str]:
+    """
+    Построение ключа кэша по имени инструмента и аргументам.
+
+    Returns:
+        Ключ или None, если результат инструмента не кэшируется.
+    """
+    if tool_name in _NON_CACHEABLE or RESULT_CACHE_SIZE <= 0:
+        return None
+    try:
+        args = orjson.dumps(arguments, option=orjson.OPT_SORT_KEYS)
+    except TypeError:
+        return None
+    return f"{tool_name}|{args.decode()}"
+
+
+def get_cached(key: Optional[str]) -> Tuple[bool, Any]:
+    """
+    Поиск результата в кэше.
+
+    Returns:
+        Кортеж (найдено, результат).
+    """
+    if key is None:
+        return False, None
+    entry = _RESULT_CACHE.get(key)
+    if entry is not None:
+        stored_at, result = entry
+        if time.monotonic() - stored_at < RESULT_CACHE_TTL:
+            _RESULT_CACHE.move_to_end(key)
+            _STATS["hits"] += 1
+            return True, result
+        del _RESULT_CACHE[key]
+    _STATS["misses"] += 1
+    return False, None
+
+
+def store(key: Optional[str], result: Any) -> None:
+    """Сохранение результата с вытеснением самых старых записей."""
+    # Ответы с ошибкой (сеть, внешний API) не кэшируются
+    if key is None or (isinstance(result, dict) and "error" in result):
+        return
+    _RESULT_CACHE[key] = (time.monotonic(), result)
+    _RESULT_CACHE.move_to_end(key)
+    while len(_RESULT_CACHE) > RESULT_CACHE_SIZE:
+        _RESULT_CACHE.popitem(last=False)
+
+
+@mcp.tool()
+async def get_cache_stats() -> Dict[str, int]:
+    """
+    Статистика кэша результатов инструментов.
+
+    Returns:
+        Словарь с количеством попаданий (hits), промахов (misses)
+        и текущим размером кэша (size).
+    """
+    return {
+        "hits": _STATS["hits"],
+        "misses": _STATS["misses"],
+        "size": len(_RESULT_CACHE),
+    }
@@ -2,12 +2,14 @@
 Утилиты для работы с OpenTDB и Yandex Translate API.
 """
 import os
+import re
 import html
-import asyncio
 from typing import List, Optional, Dict
 from dotenv import load_dotenv
 import httpx
 
+from tools.http_client import get_http_client
+
 # Загружаем переменные окружения
 load_dotenv()
 
@@ -16,6 +18,15 @@ YANDEX_API_KEY = os.getenv("YANDEX_API_KEY")
 OPENTDB_API_URL = "https://opentdb.com/api.php"
 YANDEX_TRANSLATE_URL = "https://translate.api.cloud.yandex.net/translate/v2/translate"
 
+# Всё, кроме букв (включая кириллицу), цифр, пробела, дефиса и подчёркивания
+UNSAFE_FILENAME_RE = re.compile(r"[^\w \-]+")
+
+
+def sanitize_filename(text: str, max_length: int) -> str:
+    """Удаление из строки символов, недопустимых в имени файла."""
+    return UNSAFE_FILENAME_RE.sub("", text).strip()[:max_length]
+
+
 # Маппинг категорий OpenTDB (название -> id)
 OPENTDB_CATEGORIES = {
     "general knowledge": 9,
@@ -55,8 +66,11 @@ async def fetch_category_id(topic: str) -> Optional[int]:
     Returns:
         ID категории или None, если не найдена
     """
-    topic_lower = topic.lower()
-    
+    return _match_category(topic.lower())
+
+
+def _match_category(topic_lower: str) -> Optional[int]:
+    """Подбор категории OpenTDB по теме."""
     # Прямой поиск по ключам
     for category_name, category_id in OPENTDB_CATEGORIES.items():
         if topic_lower in category_name or category_name in topic_lower:
@@ -108,22 +122,23 @@ async def translate_batch(texts: List[str], target: str = "ru") -> List[str]:
             body["folderId"] = folder_id
 
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                YANDEX_TRANSLATE_URL,
-                headers=headers,
-                json=body
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            # Извлекаем переведенные тексты
-            translations = []
-            for translation in data.get("translations", []):
-                translations.append(translation.get("text", ""))
-            
-            return translations if translations else texts
-            
+        client = get_http_client()
+        response = await client.post(
+            YANDEX_TRANSLATE_URL,
+            headers=headers,
+            json=body,
+            timeout=30.0
+        )
+        response.raise_for_status()
+        data = response.json()
+
+        # Извлекаем переведенные тексты
+        translations = []
+        for translation in data.get("translations", []):
+            translations.append(translation.get("text", ""))
+
+        return translations if translations else texts
+
     except httpx.HTTPError as e:
         # В случае ошибки возвращаем оригинальные тексты
         print(f"Ошибка перевода: {e}")
@@ -150,20 +165,20 @@ async def fetch_questions_from_opentdb(
     if question_type:
         params["type"] = question_type
     
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        response = await client.get(OPENTDB_API_URL, params=params)
-        if response.status_code != 200:
-            return {"response_code": 1, "results": []}
-        data = response.json()
+    client = get_http_client()
+    response = await client.get(OPENTDB_API_URL, params=params, timeout=10.0)
+    if response.status_code != 200:
+        return {"response_code": 1, "results": []}
+    data = response.json()
         
-        # Обрабатываем HTML-сущности
-        if data.get("results"):
-            for question in data["results"]:
-                question["question"] = html.unescape(question["question"])
-                question["correct_answer"] = html.unescape(question["correct_answer"])
-                question["incorrect_answers"] = [
-                    html.unescape(ans) for ans in question["incorrect_answers"]
-                ]
+    # Обрабатываем HTML-сущности
+    if data.get("results"):
+        for question in data["results"]:
+            question["question"] = html.unescape(question["question"])
+            question["correct_answer"] = html.unescape(question["correct_answer"])
+            question["incorrect_answers"] = [
+                html.unescape(ans) for ans in question["incorrect_answers"]
+            ]
         
-        return data
+    return data
 
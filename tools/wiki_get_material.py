@@ -2,29 +2,177 @@
 Инструмент для получения учебного материала из вики-источников.
 Поддерживает Wikibooks, Vikidia и Wikipedia с приоритетом детских ресурсов.
 """
+import os
 import re
-from typing import Dict, List, Optional
+import time
+import asyncio
+import functools
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 import httpx
+import orjson
 from pydantic import Field
 
 from mcp_instance import mcp
+from tools.http_client import get_http_client
 
 
-# API URLs для разных вики-проектов
-WIKI_SOURCES = {
-    "ru": [
-        {"name": "wikibooks", "url": "https://ru.wikibooks.org/w/api.php"},
-        {"name": "wikipedia", "url": "https://ru.wikipedia.org/w/api.php"},
-    ],
-    "en": [
-        {"name": "wikibooks", "url": "https://en.wikibooks.org/w/api.php"},
-        {"name": "vikidia", "url": "https://en.vikidia.org/w/api.php"},
-        {"name": "wikipedia", "url": "https://en.wikipedia.org/w/api.php"},
-    ],
+# API URLs для разных вики-проектов: язык -> (имя, URL) в порядке приоритета
+WIKI_SOURCES: Dict[str, Tuple[Tuple[str, str], ...]] = {
+    "ru": (
+        ("wikibooks", "https://ru.wikibooks.org/w/api.php"),
+        ("wikipedia", "https://ru.wikipedia.org/w/api.php"),
+    ),
+    "en": (
+        ("wikibooks", "https://en.wikibooks.org/w/api.php"),
+        ("vikidia", "https://en.vikidia.org/w/api.php"),
+        ("wikipedia", "https://en.wikipedia.org/w/api.php"),
+    ),
 }
 
 USER_AGENT = "WikiMaterialMCP/1.0 (Educational Bot; https://github.com/example/mcp-edtech; contact@example.com)"
 
+# Кэш ответов MediaWiki API: время жизни записи (сек) и число записей
+WIKI_CACHE_TTL = float(os.getenv("WIKI_CACHE_TTL", "3600"))
+WIKI_CACHE_SIZE = int(os.getenv("WIKI_CACHE_SIZE", "1024"))
+# Бюджет памяти (байты) для кэшей с полными текстами статей
+WIKI_CACHE_MAX_BYTES = int(os.getenv("WIKI_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+
+# Ограничение одновременных запросов к одному вики-API и повторы при
+# ответах 429/5xx (MediaWiki ограничивает частоту запросов)
+WIKI_MAX_CONCURRENCY = int(os.getenv("WIKI_MAX_CONCURRENCY", "8"))
+WIKI_MAX_RETRIES = 3
+_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+_MAX_RETRY_DELAY = 8.0
+
+# API URL -> семафор и event loop, к которому они привязаны
+_WIKI_SEMAPHORES: Dict[str, asyncio.Semaphore] = {}
+_WIKI_SEMAPHORES_LOOP: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _retry_delay(response: httpx.Response, attempt: int) -> float:
+    """Пауза перед повтором: Retry-After из ответа или экспоненциальная."""
+    retry_after = response.headers.get("Retry-After")
+    if retry_after:
+        try:
+            return min(float(retry_after), _MAX_RETRY_DELAY)
+        except ValueError:
+            pass
+    return min(0.5 * 2 ** attempt, _MAX_RETRY_DELAY)
+
+
+async def _wiki_get(api_url: str, params: Dict[str, Any], timeout: float) -> httpx.Response:
+    """
+    GET-запрос к MediaWiki API с ограничением параллельности и повторами.
+    
+    Raises:
+        httpx.HTTPStatusError: Если ответ с ошибкой и попытки исчерпаны.
+    """
+    global _WIKI_SEMAPHORES_LOOP
+    # Семафоры привязаны к event loop, как и клиент в tools/http_client.py:
+    # в новом loop (несколько asyncio.run() в тестах) создаются заново
+    loop = asyncio.get_running_loop()
+    if _WIKI_SEMAPHORES_LOOP is not loop:
+        _WIKI_SEMAPHORES.clear()
+        _WIKI_SEMAPHORES_LOOP = loop
+    
+    semaphore = _WIKI_SEMAPHORES.get(api_url)
+    if semaphore is None:
+        semaphore = _WIKI_SEMAPHORES[api_url] = asyncio.Semaphore(WIKI_MAX_CONCURRENCY)
+    
+    client = get_http_client()
+    for attempt in range(WIKI_MAX_RETRIES + 1):
+        async with semaphore:
+            response = await client.get(
+                api_url,
+                params=params,
+                headers={"User-Agent": USER_AGENT},
+                timeout=timeout
+            )
+        if response.status_code not in _RETRY_STATUSES or attempt == WIKI_MAX_RETRIES:
+            break
+        # Ждём вне семафора, чтобы не занимать слот
+        await asyncio.sleep(_retry_delay(response, attempt))
+    
+    response.raise_for_status()
+    return response
+
+
+def _async_ttl_cache(
+    maxsize: int, ttl: float, max_bytes: int = 0
+) -> Callable[[Callable[..., Awaitable[Any]]], Callable[..., Awaitable[Any]]]:
+    """
+    Кэширование результатов async-функции по позиционным аргументам (LRU + TTL).
+    
+    Пустые результаты (None) не кэшируются, чтобы сетевая ошибка не
+    запоминалась на весь TTL. Одновременные промахи по одному ключу
+    ждут единственный запрос (блокировка на ключ).
+    
+    Args:
+        maxsize: Максимальное число записей.
+        ttl: Время жизни записи (секунды).
+        max_bytes: Ограничение суммарного размера результатов (размер
+            в JSON, байты); 0 — без ограничения.
+    """
+    def decorator(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        # Ключ -> (время записи, результат, размер в байтах)
+        cache: "OrderedDict[Tuple, Tuple[float, Any, int]]" = OrderedDict()
+        locks: Dict[Tuple, asyncio.Lock] = {}
+        total_bytes = 0
+        
+        def evict(key: Tuple) -> None:
+            nonlocal total_bytes
+            total_bytes -= cache.pop(key)[2]
+        
+        def lookup(key: Tuple) -> Tuple[bool, Any]:
+            entry = cache.get(key)
+            if entry is not None:
+                stored_at, value, _ = entry
+                if time.monotonic() - stored_at < ttl:
+                    cache.move_to_end(key)
+                    return True, value
+                evict(key)
+            return False, None
+        
+        def store(key: Tuple, value: Any) -> None:
+            nonlocal total_bytes
+            size = len(orjson.dumps(value)) if max_bytes > 0 else 0
+            # Результат больше всего бюджета не кэшируем
+            if max_bytes > 0 and size > max_bytes:
+                return
+            cache[key] = (time.monotonic(), value, size)
+            total_bytes += size
+            while len(cache) > maxsize or (max_bytes > 0 and total_bytes > max_bytes):
+                evict(next(iter(cache)))
+        
+        @functools.wraps(func)
+        async def wrapper(*args):
+            if maxsize <= 0:
+                return await func(*args)
+            
+            hit, value = lookup(args)
+            if hit:
+                return value
+            
+            lock = locks.setdefault(args, asyncio.Lock())
+            try:
+                async with lock:
+                    # Пока ждали блокировку, значение мог загрузить другой вызов
+                    hit, value = lookup(args)
+                    if hit:
+                        return value
+                    value = await func(*args)
+                    if value is not None:
+                        store(args, value)
+                    return value
+            finally:
+                if not lock.locked() and locks.get(args) is lock:
+                    del locks[args]
+        
+        return wrapper
+    return decorator
+
 
 def _clean_wiki_text(text: str) -> str:
     """Очистка текста от вики-разметки и служебных символов."""
@@ -51,17 +199,19 @@ def _truncate_content(content: str, max_chars: int) -> str:
     if len(content) <= max_chars:
         return content
     
-    truncated = content[:max_chars]
-    # Найти последний пробел или перенос строки
-    last_space = truncated.rfind(' ')
-    last_newline = truncated.rfind('\n')
+    # Найти последний пробел или перенос строки. Точка разреза раньше 70%
+    # лимита не подходит, поэтому ищем только в хвосте и без копии строки
+    min_cut = int(max_chars * 0.7)
+    last_space = content.rfind(' ', min_cut, max_chars)
+    last_newline = content.rfind('\n', min_cut, max_chars)
     cut_point = max(last_space, last_newline)
     
     if cut_point > max_chars * 0.7:  # Если нашли подходящую точку
-        return truncated[:cut_point] + "..."
-    return truncated + "..."
+        return content[:cut_point] + "..."
+    return content[:max_chars] + "..."
 
 
+@_async_ttl_cache(WIKI_CACHE_SIZE, WIKI_CACHE_TTL)
 async def _search_wiki(api_url: str, query: str) -> Optional[Dict]:
     """Поиск статьи в указанном вики-источнике."""
     params = {
@@ -74,23 +224,18 @@ async def _search_wiki(api_url: str, query: str) -> Optional[Dict]:
     }
     
     try:
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            response = await client.get(
-                api_url,
-                params=params,
-                headers={"User-Agent": USER_AGENT}
-            )
-            response.raise_for_status()
-            data = response.json()
+        response = await _wiki_get(api_url, params, timeout=15.0)
+        data = orjson.loads(response.content)
             
-            results = data.get("query", {}).get("search", [])
-            if results:
-                return {"title": results[0]["title"], "pageid": results[0]["pageid"]}
+        results = data.get("query", {}).get("search", [])
+        if results:
+            return {"title": results[0]["title"], "pageid": results[0]["pageid"]}
     except Exception:
         pass
     return None
 
 
+@_async_ttl_cache(WIKI_CACHE_SIZE, WIKI_CACHE_TTL, WIKI_CACHE_MAX_BYTES)
 async def _get_article_content(api_url: str, title: str) -> Optional[Dict]:
     """Получить полное содержимое статьи с секциями."""
     params = {
@@ -105,81 +250,96 @@ async def _get_article_content(api_url: str, title: str) -> Optional[Dict]:
     }
     
     try:
-        async with httpx.AsyncClient(timeout=20.0) as client:
-            response = await client.get(
-                api_url,
-                params=params,
-                headers={"User-Agent": USER_AGENT}
-            )
-            response.raise_for_status()
-            data = response.json()
+        response = await _wiki_get(api_url, params, timeout=20.0)
+        data = orjson.loads(response.content)
             
-            pages = data.get("query", {}).get("pages", {})
-            if not pages:
-                return None
+        pages = data.get("query", {}).get("pages", {})
+        if not pages:
+            return None
             
-            page = next(iter(pages.values()))
-            if "missing" in page:
-                return None
+        page = next(iter(pages.values()))
+        if "missing" in page:
+            return None
             
-            return {
-                "title": page.get("title", ""),
-                "extract": page.get("extract", ""),
-                "url": page.get("fullurl", ""),
-            }
+        return {
+            "title": page.get("title", ""),
+            "extract": page.get("extract", ""),
+            "url": page.get("fullurl", ""),
+        }
     except Exception:
         pass
     return None
 
 
+@_async_ttl_cache(WIKI_CACHE_SIZE, WIKI_CACHE_TTL, WIKI_CACHE_MAX_BYTES)
+async def _search_and_fetch(api_url: str, query: str) -> Optional[Dict]:
+    """
+    Поиск статьи и получение её содержимого одним запросом к MediaWiki API.
+    
+    generator=search подставляет лучший результат поиска в prop=extracts,
+    поэтому вместо двух запросов (_search_wiki + _get_article_content)
+    выполняется один.
+    """
+    params = {
+        "action": "query",
+        "format": "json",
+        "generator": "search",
+        "gsrsearch": query,
+        "gsrlimit": 1,
+        "prop": "extracts|info",
+        "inprop": "url",
+        "explaintext": 1,
+        "exsectionformat": "wiki",
+        "redirects": 1,
+        "utf8": 1,
+    }
+    
+    try:
+        response = await _wiki_get(api_url, params, timeout=20.0)
+        data = orjson.loads(response.content)
+        
+        pages = data.get("query", {}).get("pages", {})
+        if not pages:
+            return None
+        
+        page = next(iter(pages.values()))
+        if "missing" in page:
+            return None
+        
+        return {
+            "title": page.get("title", ""),
+            "extract": page.get("extract", ""),
+            "url": page.get("fullurl", ""),
+            "pageid": page.get("pageid"),
+        }
+    except Exception:
+        pass
+    return None
+
+
+# Заголовок секции (== Заголовок ==) — отдельная строка текста
+_SECTION_HEADER_RE = re.compile(r'^==+[^\S\n]*([^=\n]+?)[^\S\n]*==+$', re.MULTILINE)
+
+
 def _parse_sections(text: str, title: str) -> Dict:
     """Разбить текст на секции по заголовкам."""
     if not text:
         return {"summary": "", "sections": []}
     
-    # Разделяем по заголовкам (== Заголовок ==)
-    section_pattern = r'^==+\s*([^=]+?)\s*==+$'
-    lines = text.split('\n')
+    # Один проход регулярного выражения; тексты секций — срезы исходной строки
+    headers = list(_SECTION_HEADER_RE.finditer(text))
+    ends = [header.start() for header in headers[1:]] + [len(text)]
     
     sections: List[Dict[str, str]] = []
-    current_section: Optional[Dict[str, str]] = None
-    summary_lines: List[str] = []
+    for header, end in zip(headers, ends):
+        content = _clean_wiki_text(text[header.end():end])
+        if content.strip():
+            sections.append({
+                "title": header.group(1).strip(),
+                "content": content
+            })
     
-    in_summary = True
-    
-    for line in lines:
-        match = re.match(section_pattern, line)
-        if match:
-            in_summary = False
-            # Сохраняем предыдущую секцию
-            if current_section:
-                current_section["content"] = _clean_wiki_text(
-                    '\n'.join(current_section.get("_lines", []))
-                )
-                del current_section["_lines"]
-                if current_section["content"].strip():
-                    sections.append(current_section)
-            
-            current_section = {
-                "title": match.group(1).strip(),
-                "_lines": []
-            }
-        else:
-            if in_summary:
-                summary_lines.append(line)
-            elif current_section:
-                current_section["_lines"].append(line)
-    
-    # Добавляем последнюю секцию
-    if current_section:
-        current_section["content"] = _clean_wiki_text(
-            '\n'.join(current_section.get("_lines", []))
-        )
-        del current_section["_lines"]
-        if current_section["content"].strip():
-            sections.append(current_section)
-    
-    summary = _clean_wiki_text('\n'.join(summary_lines))
+    summary = _clean_wiki_text(text[:headers[0].start()] if headers else text)
     
     return {
         "summary": summary,
@@ -189,10 +349,10 @@ def _parse_sections(text: str, title: str) -> Dict:
 
 def _apply_max_chars(result: Dict, max_chars: int) -> Dict:
     """Применить ограничение по символам к результату."""
-    total_chars = len(result.get("summary", ""))
-    
-    for section in result.get("sections", []):
-        total_chars += len(section.get("content", ""))
+    sections = result.get("sections", [])
+    total_chars = len(result.get("summary", "")) + sum(
+        len(section.get("content", "")) for section in sections
+    )
     
     if total_chars <= max_chars:
         return result
@@ -210,7 +370,6 @@ def _apply_max_chars(result: Dict, max_chars: int) -> Dict:
         remaining_chars -= len(result["summary"])
     
     # Распределяем оставшееся место между секциями
-    sections = result.get("sections", [])
     if sections and remaining_chars > 0:
         chars_per_section = remaining_chars // len(sections)
         
@@ -266,15 +425,10 @@ async def wiki_get_material(
     source_urls: List[str] = []
     
     # Пробуем найти материал в разных источниках
-    for source in sources:
+    for source_name, source_url in sources:
         try:
-            # Поиск статьи
-            search_result = await _search_wiki(source["url"], topic)
-            if not search_result:
-                continue
-            
-            # Получаем содержимое
-            article = await _get_article_content(source["url"], search_result["title"])
+            # Поиск статьи и её содержимое одним запросом
+            article = await _search_and_fetch(source_url, topic)
             if not article or not article.get("extract"):
                 continue
             
@@ -291,7 +445,7 @@ async def wiki_get_material(
                     "summary": parsed["summary"],
                     "sections": parsed["sections"],
                     "source_urls": source_urls,
-                    "source": source["name"]
+                    "source": source_name
                 }
                 
                 # Применяем ограничение по символам
@@ -310,6 +464,6 @@ async def wiki_get_material(
     return {
         "error": f"Не удалось найти учебный материал по теме '{topic}' ни в одном из источников.",
         "topic": topic,
-        "searched_sources": [s["name"] for s in sources]
+        "searched_sources": [name for name, _ in sources]
     }
 